@@ -2,15 +2,65 @@
 Configuration management for Government Document AI System
 """
 import os
+import threading
+from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
 from dotenv import load_dotenv
 
-# Load environment variables
-load_dotenv()
+# Guard so the .env file is parsed only once per process
+_dotenv_lock = threading.Lock()
+_dotenv_loaded = False
+
+
+def _load_dotenv_once():
+    """Load environment variables from .env exactly once"""
+    global _dotenv_loaded
+    with _dotenv_lock:
+        if not _dotenv_loaded:
+            load_dotenv()
+            _dotenv_loaded = True
+
+
+@dataclass(frozen=True, slots=True)
+class _Config:
+    """Snapshot of environment-driven settings"""
+    upload_dir: Path
+    tesseract_cmd: str
+    max_file_size_mb: int
+    host: str
+    port: int
+    workers: int
+    dev_mode: bool
+    perplexity_api_key: str
+    supabase_url: str
+    supabase_key: str
+
+
+@lru_cache(maxsize=1)
+def get_config() -> _Config:
+    """Read the environment once and return the cached settings"""
+    _load_dotenv_once()
+    env = os.environ
+    return _Config(
+        upload_dir=Path(env.get("UPLOAD_DIR", "./uploads")),
+        tesseract_cmd=env.get("TESSERACT_CMD", "/usr/local/bin/tesseract"),
+        max_file_size_mb=int(env.get("MAX_FILE_SIZE_MB", 50)),
+        host=env.get("HOST", "0.0.0.0"),
+        port=int(env.get("PORT", 8000)),
+        workers=int(env.get("WORKERS", 1)),
+        dev_mode=env.get("DEV", "").lower() in ("1", "true", "yes"),
+        perplexity_api_key=env.get("PERPLEXITY_API_KEY", ""),
+        supabase_url=env.get("SUPABASE_URL", ""),
+        supabase_key=env.get("SUPABASE_KEY", ""),
+    )
+
+
+_config = get_config()
 
 # Base paths
 BASE_DIR = Path(__file__).parent
-UPLOAD_DIR = Path(os.getenv("UPLOAD_DIR", "./uploads"))
+UPLOAD_DIR = _config.upload_dir
 DATA_DIR = BASE_DIR / "data"
 BLOCKCHAIN_DIR = BASE_DIR / "blockchain"
 
@@ -20,15 +70,19 @@ DATA_DIR.mkdir(exist_ok=True)
 BLOCKCHAIN_DIR.mkdir(exist_ok=True)
 
 # API Keys
-PERPLEXITY_API_KEY = os.getenv("PERPLEXITY_API_KEY", "")
+PERPLEXITY_API_KEY = _config.perplexity_api_key
 PERPLEXITY_BASE_URL = "https://api.perplexity.ai"
 
+# Supabase
+SUPABASE_URL = _config.supabase_url
+SUPABASE_KEY = _config.supabase_key
+
 # Tesseract configuration
-TESSERACT_CMD = os.getenv("TESSERACT_CMD", "/usr/local/bin/tesseract")
+TESSERACT_CMD = _config.tesseract_cmd
 
 # File settings
-MAX_FILE_SIZE_MB = int(os.getenv("MAX_FILE_SIZE_MB", 50))
-ALLOWED_EXTENSIONS = {".pdf", ".png", ".jpg", ".jpeg", ".tiff", ".bmp"}
+MAX_FILE_SIZE_MB = _config.max_file_size_mb
+ALLOWED_EXTENSIONS = frozenset({".pdf", ".png", ".jpg", ".jpeg", ".tiff", ".bmp"})
 
 # Supported languages for OCR
 SUPPORTED_LANGUAGES = {
@@ -50,5 +104,9 @@ SUMMARY_LIMITS = {
 }
 
 # Server settings
-HOST = os.getenv("HOST", "0.0.0.0")
-PORT = int(os.getenv("PORT", 8000))
+HOST = _config.host
+PORT = _config.port
+# Ledger and search index live in process memory, so raise WORKERS only
+# when those are backed by shared storage
+WORKERS = _config.workers
+DEV_MODE = _config.dev_mode
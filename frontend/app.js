@@ -332,7 +332,8 @@ async function handleFileUpload(file) {
         throw new Error('Upload failed');
     }
 
-    const data = await response.json();
+    const upload = await response.json();
+    const data = await waitForOCR(upload.doc_id);
 
     // Store document data
     currentDocument.docId = data.doc_id;
@@ -374,6 +375,23 @@ async function handleFileUpload(file) {
     return data;
 }
 
+// OCR runs in the background; poll until the result is ready
+async function waitForOCR(docId, intervalMs = 1000) {
+    while (true) {
+        const response = await fetch(`${API_BASE}/documents/${docId}`);
+        const data = await response.json();
+
+        if (data.status === 'completed') {
+            return data.ocr;
+        }
+        if (data.status === 'failed' || !response.ok) {
+            throw new Error(data.detail || 'OCR failed');
+        }
+
+        await new Promise(resolve => setTimeout(resolve, intervalMs));
+    }
+}
+
 function showStatus(type, message) {
     const uploadStatus = document.getElementById('uploadStatus');
     if (uploadStatus) {
@@ -470,7 +488,7 @@ function displayOCRResults(data) {
         textStats.innerHTML = `
             <span><strong>Pages:</strong> ${data.metadata.page_count}</span>
             <span><strong>Words:</strong> ${data.metadata.word_count}</span>
-            <span><strong>Confidence:</strong> ${Math.round(data.confidence.overall_confidence)}%</span>
+            ${data.confidence ? `<span><strong>Confidence:</strong> ${Math.round(data.confidence.overall_confidence)}%</span>` : ''}
             <span><strong>Language:</strong> ${data.metadata.language.toUpperCase()}</span>
             ${data.metadata.has_handwriting ? '<span><strong><span class="icon icon-warning"><svg viewBox="0 0 24 24"><path d="M10.29 3.86L1.82 18a2 2 0 001.71 3h16.94a2 2 0 001.71-3L13.71 3.86a2 2 0 00-3.42 0z"/><line x1="12" y1="9" x2="12" y2="13"/><line x1="12" y1="17" x2="12.01" y2="17"/></svg></span> Handwriting detected</strong></span>' : ''}
             ${categoryHtml}
@@ -1681,7 +1699,8 @@ async function uploadAndExtractText(file) {
             method: 'POST',
             body: formData
         });
-        const data = await response.json();
+        const upload = await response.json();
+        const data = await waitForOCR(upload.doc_id);
         return data.text || '';
     } catch (error) {
         showToast('error', 'Error', 'Failed to extract text');
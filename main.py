@@ -5,33 +5,39 @@ Enhanced with Chatbot, Compliance, Comparison, Grievance, and Workflow features
 """
 import os
 import uuid
-import shutil
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
-from typing import Optional, List
+from typing import Annotated, Optional, List, Callable, Dict, Literal, Tuple
 
-from fastapi import FastAPI, File, UploadFile, HTTPException, Query, Form
+import aiofiles
+from fastapi import FastAPI, File, UploadFile, HTTPException, Query, Form, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse, JSONResponse, Response
-from pydantic import BaseModel
+from fastapi.responses import HTMLResponse, JSONResponse, ORJSONResponse, StreamingResponse
+from pydantic import AliasChoices, BaseModel, BeforeValidator, ConfigDict, Field
 
 # Import configuration
-from config import UPLOAD_DIR, ALLOWED_EXTENSIONS, MAX_FILE_SIZE_MB
+from config import UPLOAD_DIR, ALLOWED_EXTENSIONS, MAX_FILE_SIZE_MB, HOST, PORT, WORKERS, DEV_MODE
 
 # Import modules
-from modules.ocr_module import OCRProcessor
+from modules.ocr_module import OCRProcessor, limit_ocr_workers
 from modules.summarizer import DocumentSummarizer, SummaryLevel
-from modules.extractor import ActionExtractor
+from modules.extractor import ActionExtractor, Priority
 from modules.search import SemanticSearch
 from modules.rti import RTIGenerator
-from modules.blockchain import BlockchainVerifier
-from modules.pdf_generator import generate_text_pdf, generate_summary_pdf, generate_rti_pdf
+from modules.blockchain import BlockchainVerifier, get_verifier, hash_content
+from modules.pdf_generator import generate_text_pdf_stream, generate_summary_pdf_stream, generate_rti_pdf
 from modules.classifier import classify_document
 from modules.database import save_document, get_all_documents_from_db, get_document_by_id, find_similar_documents
 
 # Import NEW modules for hackathon features
-from modules.chatbot import chat_with_document, chatbot
+from modules.chatbot import chat_with_document, stream_chat_with_document, chatbot
 from modules.compliance import check_document_compliance
 from modules.comparator import compare_documents
 from modules.grievance import register_grievance, get_grievances, get_grievance_stats, grievance_tracker
@@ -44,7 +50,8 @@ app = FastAPI(
     description="AI-powered document processing for government offices. Features: OCR, Summarization, Search, RTI, Chatbot, Compliance Check, Workflow Tracking.",
     version="2.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=ORJSONResponse
 )
 
 # CORS middleware for frontend
@@ -61,73 +68,151 @@ frontend_path = Path(__file__).parent / "frontend"
 if frontend_path.exists():
     app.mount("/static", StaticFiles(directory=frontend_path), name="static")
 
-# Initialize modules
-ocr_processor = OCRProcessor()
-summarizer = DocumentSummarizer()
-action_extractor = ActionExtractor()
-search_engine = SemanticSearch()
-rti_generator = RTIGenerator()
-blockchain = BlockchainVerifier()
+UPLOAD_CHUNK_SIZE = 1 << 20  # 1 MB
+MAX_UPLOAD_BYTES = MAX_FILE_SIZE_MB * 1024 * 1024
+
+# Pages each OCR pool worker processes at once; the pool gets the rest of
+# the cores, so concurrent uploads never run more Tesseracts than cores
+OCR_PAGES_PER_WORKER = 2
+
+# Status of uploads processed in the background, keyed by doc_id
+MAX_TRACKED_UPLOADS = 256
+_upload_jobs: "OrderedDict[str, dict]" = OrderedDict()
+
+def _set_upload_job(doc_id: str, job: dict):
+    """Record upload progress, forgetting the oldest entries beyond the cap"""
+    _upload_jobs[doc_id] = job
+    _upload_jobs.move_to_end(doc_id)
+    while len(_upload_jobs) > MAX_TRACKED_UPLOADS:
+        _upload_jobs.popitem(last=False)
+
+# Heavy modules are constructed on first use so cold start stays cheap
+@lru_cache(maxsize=1)
+def get_ocr() -> OCRProcessor:
+    return OCRProcessor()
+
+@lru_cache(maxsize=1)
+def get_summarizer() -> DocumentSummarizer:
+    return DocumentSummarizer()
+
+@lru_cache(maxsize=1)
+def get_action_extractor() -> ActionExtractor:
+    return ActionExtractor()
+
+@lru_cache(maxsize=1)
+def get_search_engine() -> SemanticSearch:
+    return SemanticSearch()
+
+@lru_cache(maxsize=1)
+def get_rti_generator() -> RTIGenerator:
+    return RTIGenerator()
+
+# Shared with modules.blockchain so only one verifier appends to the ledger
+def get_blockchain() -> BlockchainVerifier:
+    return get_verifier()
+
+
+# Short-lived cache for polled stats endpoints (/health, /analytics)
+STATS_CACHE_TTL_SECONDS = 2.0
+_stats_cache: Dict[str, Tuple[float, dict]] = {}
+
+def _cached_stats(key: str, build: Callable[[], dict]) -> dict:
+    """Return the cached response for key, rebuilding it once the TTL expires"""
+    now = time.monotonic()
+    cached = _stats_cache.get(key)
+    if cached and now - cached[0] < STATS_CACHE_TTL_SECONDS:
+        return cached[1]
+    response = build()
+    _stats_cache[key] = (now, response)
+    return response
+
+def _invalidate_stats_cache():
+    """Drop cached stats after a mutating request"""
+    _stats_cache.clear()
+
+
+# Recent LLM responses for /translate and /chat, keyed by content digests
+MAX_CACHED_RESPONSES = 1024
+_response_cache: "OrderedDict[tuple, dict]" = OrderedDict()
+
+def _text_digest(text: str) -> bytes:
+    """Fixed-size digest so long documents don't become long cache keys"""
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest()
+
+def _store_response(key: tuple, response: dict):
+    """Cache a response, evicting the least recently used beyond the cap"""
+    _response_cache[key] = response
+    _response_cache.move_to_end(key)
+    while len(_response_cache) > MAX_CACHED_RESPONSES:
+        _response_cache.popitem(last=False)
 
 
 # ========================
 # Pydantic Models
 # ========================
 
-class SummarizeRequest(BaseModel):
+class RequestModel(BaseModel):
+    """Shared config for request bodies: immutable, no unknown fields, trimmed strings"""
+    model_config = ConfigDict(frozen=True, extra='forbid', str_strip_whitespace=True)
+
+class SummarizeRequest(RequestModel):
     text: str
-    level: str = "director"  # secretary, director, officer
+    # Accepted case-insensitively, as before the Literal was introduced
+    level: Annotated[
+        Literal["secretary", "director", "officer"],
+        BeforeValidator(lambda v: v.strip().lower() if isinstance(v, str) else v)
+    ] = "director"
 
-class TranslateRequest(BaseModel):
+class TranslateRequest(RequestModel):
     text: str
     target_lang: str = "hindi"
 
-class SearchRequest(BaseModel):
+class SearchRequest(RequestModel):
     query: str
     top_k: int = 10
 
-class ExtractRequest(BaseModel):
+class ExtractRequest(RequestModel):
     text: str
 
-class RTIRequest(BaseModel):
+class RTIRequest(RequestModel):
     query: str
     applicant_name: str = "Applicant"
     response_type: str = "standard"
 
-class VerifyRequest(BaseModel):
+class VerifyRequest(RequestModel):
     doc_id: str
     content: str
 
-class AddDocumentRequest(BaseModel):
+class AddDocumentRequest(RequestModel):
     doc_id: str
     text: str
     title: str = ""
 
-class PDFExportRequest(BaseModel):
+class PDFExportRequest(RequestModel):
     text: str
     doc_id: str = ""
     title: str = "Extracted Document"
 
-class ClassifyRequest(BaseModel):
+class ClassifyRequest(RequestModel):
     text: str
 
 # NEW: Chatbot request model
-class ChatRequest(BaseModel):
+class ChatRequest(RequestModel):
     message: str
     document_text: str = ""
     doc_id: str = ""
 
 # NEW: Compliance request model
-class ComplianceRequest(BaseModel):
+class ComplianceRequest(RequestModel):
     text: str
 
 # NEW: Comparison request model
-class CompareRequest(BaseModel):
+class CompareRequest(RequestModel):
     doc1_text: str
     doc2_text: str
 
 # NEW: Grievance request model
-class GrievanceRequest(BaseModel):
+class GrievanceRequest(RequestModel):
     subject: str
     details: str
     priority: str = "normal"
@@ -135,12 +220,67 @@ class GrievanceRequest(BaseModel):
     citizen_name: str = ""
 
 # NEW: Workflow request model
-class WorkflowRequest(BaseModel):
+class WorkflowRequest(RequestModel):
     doc_id: str
     title: str = ""
     priority: str = "normal"
 
 
+# ========================
+# Response Models
+# ========================
+
+class SummarizeResponse(BaseModel):
+    success: bool = True
+    level: str
+    summary: str
+    word_count: int
+    key_points: list
+    action_required: bool
+
+class ActionOut(BaseModel):
+    """Serialized straight from an extractor ActionItem"""
+    model_config = ConfigDict(from_attributes=True)
+    
+    who: str
+    what: str
+    when: Optional[str]
+    deadline: Optional[datetime] = Field(validation_alias=AliasChoices("deadline", "deadline_date"))
+    priority: Priority
+    confidence: float
+    original_text: str
+
+class ExtractResponse(BaseModel):
+    success: bool = True
+    actions: List[ActionOut]
+    deadlines: List[dict]
+    responsible_parties: List[str]
+    financial_amounts: List[dict]
+    references: List[str]
+
+class SearchHit(BaseModel):
+    doc_id: str
+    title: str
+    score: float
+    matched_section: str
+    highlights: List[str]
+
+class SearchResponse(BaseModel):
+    success: bool = True
+    query: str
+    total_results: int
+    results: List[SearchHit]
+
+class RTIGenerateResponse(BaseModel):
+    success: bool = True
+    letter: str
+    relevant_documents: List[dict]
+    redacted_items: List[str]
+    response_date: str
+    appeal_info: str
+    word_count: int
+
+
 # ========================
 # Root & Info Endpoints
 # ========================
@@ -174,111 +314,170 @@ async def root():
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
-    return {
+    return _cached_stats("health", lambda: {
         "status": "healthy",
         "timestamp": datetime.now().isoformat(),
         "modules": {
             "ocr": "ready",
             "summarizer": "ready",
-            "search": f"{search_engine.get_document_count()} documents indexed",
-            "blockchain": blockchain.get_stats()
+            "search": f"{get_search_engine().get_document_count()} documents indexed",
+            "blockchain": get_blockchain().get_stats()
         }
-    }
+    })
 
 
 # ========================
 # OCR Endpoint
 # ========================
 
-@app.post("/upload-ocr")
+def _ocr_pipeline(file_path: str, ext: str):
+    """
+    CPU-bound part of the upload pipeline, executed in the process pool.
+    Blockchain, search index and database writes stay in the server process
+    because they mutate in-memory state.
+    """
+    ocr_processor = get_ocr()
+    if ext == ".pdf":
+        result = ocr_processor.process_pdf(file_path)
+    else:
+        result = ocr_processor.process_image(file_path)
+    
+    confidence_report = ocr_processor.get_confidence_report(result)
+    classification = classify_document(result.text)
+    text_hash = hash_content(result.text)
+    return result, confidence_report, classification, text_hash
+
+
+@app.post("/upload-ocr", status_code=202)
 async def upload_and_ocr(
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     languages: str = Query("hin+eng", description="OCR languages (e.g., hin+eng)")
 ):
     """
-    Upload and extract text from PDF or image
+    Upload a PDF or image and queue it for text extraction
     
     - Supports Hindi + English
     - Handles handwritten notes
-    - Returns confidence score
+    - Returns immediately with status "processing";
+      poll GET /documents/{doc_id} for the OCR result
     """
     # Validate file extension
-    ext = Path(file.filename).suffix.lower()
+    _, dot, tail = (file.filename or "").rpartition(".")
+    ext = "." + tail.lower() if dot else ""
     if ext not in ALLOWED_EXTENSIONS:
         raise HTTPException(
             status_code=400,
-            detail=f"Unsupported file type. Allowed: {ALLOWED_EXTENSIONS}"
+            detail=f"Unsupported file type. Allowed: {', '.join(sorted(ALLOWED_EXTENSIONS))}"
         )
     
     # Save uploaded file
-    doc_id = str(uuid.uuid4())[:8]
+    doc_id = uuid.uuid4().hex[:8]
     file_path = UPLOAD_DIR / f"{doc_id}{ext}"
     
     try:
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-        
-        # Process with OCR
-        if ext == ".pdf":
-            result = ocr_processor.process_pdf(str(file_path))
-        else:
-            result = ocr_processor.process_image(str(file_path))
-        
-        # Register on blockchain
-        blockchain.register_document(doc_id, result.text, "upload_system")
-        
-        # Add to search index
-        search_engine.add_document(doc_id, result.text, file.filename)
-        
-        # Get confidence report
-        confidence_report = ocr_processor.get_confidence_report(result)
-        
-        # Classify document
-        classification = classify_document(result.text)
+        # Stream upload to disk in chunks, rejecting oversized files early
+        # and hashing the raw bytes in the same pass
+        bytes_written = 0
+        file_hasher = hashlib.sha256()
+        async with aiofiles.open(file_path, "wb") as buffer:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                bytes_written += len(chunk)
+                if bytes_written > MAX_UPLOAD_BYTES:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"File too large. Maximum size: {MAX_FILE_SIZE_MB} MB"
+                    )
+                file_hasher.update(chunk)
+                await buffer.write(chunk)
+    except HTTPException as e:
+        if e.status_code == 413:
+            file_path.unlink(missing_ok=True)
+        raise
+    except Exception as e:
+        # Never leave a truncated upload behind
+        file_path.unlink(missing_ok=True)
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    _set_upload_job(doc_id, {"status": "processing", "filename": file.filename})
+    background_tasks.add_task(
+        _run_ocr_pipeline,
+        doc_id, file_path, ext, file.filename, file_hasher.hexdigest(), bytes_written
+    )
+    
+    return {
+        "success": True,
+        "doc_id": doc_id,
+        "filename": file.filename,
+        "status": "processing"
+    }
+
+
+async def _run_ocr_pipeline(
+    doc_id: str,
+    file_path: Path,
+    ext: str,
+    filename: str,
+    file_hash: str,
+    file_size: int
+):
+    """Background part of /upload-ocr: OCR, register, index and persist"""
+    try:
+        # OCR, classification and text hashing run in the CPU pool
+        loop = asyncio.get_running_loop()
+        result, confidence_report, classification, text_hash = await loop.run_in_executor(
+            app.state.cpu_pool, _ocr_pipeline, str(file_path), ext
+        )
         
-        # Check for similar/duplicate documents
-        similar_docs = find_similar_documents(result.text, threshold=0.6)
+        # Blockchain registration, indexing and duplicate check are independent
+        _, _, similar_docs = await asyncio.gather(
+            asyncio.to_thread(get_blockchain().register_document_prehashed, doc_id, text_hash, "upload_system"),
+            asyncio.to_thread(get_search_engine().add_document, doc_id, result.text, filename),
+            asyncio.to_thread(find_similar_documents, result.text, 0.6)
+        )
+        _invalidate_stats_cache()
         
         # Save to database for persistence
         save_document(
             doc_id=doc_id,
-            filename=file.filename,
+            filename=filename,
             file_path=str(file_path),
             ocr_text=result.text,
             file_type=ext,
-            file_size=file_path.stat().st_size,
+            file_size=file_size,
             metadata={
                 "page_count": result.page_count,
                 "word_count": result.word_count,
                 "language": result.language,
                 "has_handwriting": result.has_handwriting,
-                "category": classification["category"]
+                "category": classification["category"],
+                "file_sha256": file_hash,
+                "confidence": confidence_report,
+                "classification": classification
             }
         )
         
-        return {
-            "success": True,
-            "doc_id": doc_id,
-            "filename": file.filename,
-            "text": result.text,
-            "metadata": {
-                "page_count": result.page_count,
-                "word_count": result.word_count,
-                "language": result.language,
-                "has_handwriting": result.has_handwriting
-            },
-            "confidence": confidence_report,
-            "category": classification["category"],
-            "classification": classification,
-            "similar_documents": similar_docs
-        }
-        
+        _set_upload_job(doc_id, {
+            "status": "completed",
+            "result": {
+                "doc_id": doc_id,
+                "filename": filename,
+                "text": result.text,
+                "metadata": {
+                    "page_count": result.page_count,
+                    "word_count": result.word_count,
+                    "language": result.language,
+                    "has_handwriting": result.has_handwriting
+                },
+                "confidence": confidence_report,
+                "category": classification["category"],
+                "classification": classification,
+                "similar_documents": similar_docs
+            }
+        })
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-    
-    finally:
-        # Cleanup temp file (optional - keep for reference)
-        pass
+        print(f"⚠ OCR pipeline failed for {doc_id}: {e}")
+        _set_upload_job(doc_id, {"status": "failed", "error": str(e)})
 
 
 # ========================
@@ -306,20 +505,52 @@ async def list_documents():
 async def get_document(doc_id: str):
     """
     Get details of a specific document
+    
+    Also reports progress of uploads queued by /upload-ocr
     """
+    job = _upload_jobs.get(doc_id)
+    if job and job["status"] == "processing":
+        return {"success": True, "doc_id": doc_id, "status": "processing"}
+    if job and job["status"] == "failed":
+        return {"success": False, "doc_id": doc_id, "status": "failed", "detail": job["error"]}
+    
     doc = get_document_by_id(doc_id)
     
-    if not doc:
+    if not doc and not job:
         raise HTTPException(status_code=404, detail="Document not found")
     
-    return {"success": True, "document": doc}
+    response = {"success": True, "status": "completed", "document": doc}
+    # The job may be evicted, lost on restart or held by another worker; the
+    # saved row carries everything the upload result needs
+    response["ocr"] = job["result"] if job else _ocr_result_from_document(doc)
+    return response
+
+
+def _ocr_result_from_document(doc: dict) -> dict:
+    """Rebuild the /upload-ocr result from a saved documents row"""
+    metadata = doc["metadata"]
+    return {
+        "doc_id": doc["doc_id"],
+        "filename": doc["filename"],
+        "text": doc["full_text"],
+        "metadata": {
+            "page_count": metadata.get("page_count", 0),
+            "word_count": metadata.get("word_count", doc["word_count"]),
+            "language": metadata.get("language", ""),
+            "has_handwriting": metadata.get("has_handwriting", False)
+        },
+        "confidence": metadata.get("confidence"),
+        "category": metadata.get("category"),
+        "classification": metadata.get("classification"),
+        "similar_documents": []
+    }
 
 
 # ========================
 # Summarization Endpoint
 # ========================
 
-@app.post("/summarize")
+@app.post("/summarize", response_model=SummarizeResponse)
 async def summarize_text(request: SummarizeRequest):
     """
     Generate summary at specified level
@@ -329,30 +560,24 @@ async def summarize_text(request: SummarizeRequest):
     - director: 1 paragraph (max 150 words)
     - officer: Detailed with action items (max 500 words)
     """
-    try:
-        level = SummaryLevel(request.level.lower())
-    except ValueError:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Invalid level. Choose from: secretary, director, officer"
-        )
+    # Level is validated against the Literal on SummarizeRequest
+    level = SummaryLevel(request.level)
     
-    result = summarizer.summarize(request.text, level)
+    result = get_summarizer().summarize(request.text, level)
     
-    return {
-        "success": True,
-        "level": result.level,
-        "summary": result.content,
-        "word_count": result.word_count,
-        "key_points": result.key_points,
-        "action_required": result.action_required
-    }
+    return SummarizeResponse(
+        level=result.level,
+        summary=result.content,
+        word_count=result.word_count,
+        key_points=result.key_points,
+        action_required=result.action_required
+    )
 
 
 @app.post("/summarize-all")
 async def summarize_all_levels(request: SummarizeRequest):
     """Generate summaries at all 3 levels"""
-    results = summarizer.summarize_all_levels(request.text)
+    results = get_summarizer().summarize_all_levels(request.text)
     
     return {
         "success": True,
@@ -370,8 +595,17 @@ async def summarize_all_levels(request: SummarizeRequest):
 @app.post("/translate")
 async def translate_document(request: TranslateRequest):
     """Translate document text to Hindi"""
-    translation = translator.translate_to_hindi(request.text)
-    
+    key = ("translate", _text_digest(request.text), "hindi")
+    cached = _response_cache.get(key)
+    if cached is not None:
+        _response_cache.move_to_end(key)
+        translation = cached["translation"]
+    else:
+        translation = translator.translate_to_hindi(request.text)
+        # Unconfigured client and API errors come back as plain messages; don't pin them
+        if translator.client and not translation.startswith("Error occurred during translation"):
+            _store_response(key, {"translation": translation})
+
     return {
         "success": True,
         "translation": translation,
@@ -383,7 +617,7 @@ async def translate_document(request: TranslateRequest):
 # Action Extraction Endpoint
 # ========================
 
-@app.post("/extract")
+@app.post("/extract", response_model=ExtractResponse)
 async def extract_actions(request: ExtractRequest):
     """
     Extract action items from document
@@ -393,34 +627,22 @@ async def extract_actions(request: ExtractRequest):
     - Priority flagging (critical, high, medium, low)
     - Deadlines and financial amounts
     """
-    result = action_extractor.extract(request.text)
+    result = get_action_extractor().extract(request.text)
     
-    return {
-        "success": True,
-        "actions": [
-            {
-                "who": action.who,
-                "what": action.what,
-                "when": action.when,
-                "deadline": action.deadline_date.isoformat() if action.deadline_date else None,
-                "priority": action.priority.value,
-                "confidence": action.confidence,
-                "original_text": action.original_text
-            }
-            for action in result.actions
-        ],
-        "deadlines": result.deadlines,
-        "responsible_parties": result.responsible_parties,
-        "financial_amounts": result.financial_amounts,
-        "references": result.references
-    }
+    return ExtractResponse(
+        actions=[ActionOut.model_validate(action) for action in result.actions],
+        deadlines=result.deadlines,
+        responsible_parties=result.responsible_parties,
+        financial_amounts=result.financial_amounts,
+        references=result.references
+    )
 
 
 # ========================
 # Search Endpoint
 # ========================
 
-@app.post("/search")
+@app.post("/search", response_model=SearchResponse)
 async def search_documents(request: SearchRequest):
     """
     Semantic document search
@@ -429,41 +651,33 @@ async def search_documents(request: SearchRequest):
     - Query: "recruitment freezes"
     - Finds: "hiring restrictions", "vacancy hold"
     """
-    results = search_engine.search(request.query, request.top_k)
+    results = get_search_engine().search(request.query, request.top_k)
     
+    # SearchResult dataclasses are converted by FastAPI; extra fields are dropped
     return {
-        "success": True,
         "query": request.query,
         "total_results": len(results),
-        "results": [
-            {
-                "doc_id": r.doc_id,
-                "title": r.title,
-                "score": r.score,
-                "matched_section": r.matched_section,
-                "highlights": r.highlights
-            }
-            for r in results
-        ]
+        "results": results
     }
 
 
 @app.post("/search/add-document")
 async def add_document_to_index(request: AddDocumentRequest):
     """Add a document to the search index"""
-    search_engine.add_document(
+    get_search_engine().add_document(
         request.doc_id,
         request.text,
         request.title
     )
     
     # Register on blockchain
-    blockchain.register_document(request.doc_id, request.text, "manual_add")
+    get_blockchain().register_document(request.doc_id, request.text, "manual_add")
+    _invalidate_stats_cache()
     
     return {
         "success": True,
         "doc_id": request.doc_id,
-        "indexed_documents": search_engine.get_document_count()
+        "indexed_documents": get_search_engine().get_document_count()
     }
 
 
@@ -471,7 +685,7 @@ async def add_document_to_index(request: AddDocumentRequest):
 # RTI Automation Endpoint
 # ========================
 
-@app.post("/rti/generate")
+@app.post("/rti/generate", response_model=RTIGenerateResponse)
 async def generate_rti_response(request: RTIRequest):
     """
     Generate RTI response letter automatically
@@ -482,7 +696,7 @@ async def generate_rti_response(request: RTIRequest):
     - Includes appeal mechanism
     """
     # Search for relevant documents
-    search_results = search_engine.search(request.query, top_k=5)
+    search_results = get_search_engine().search(request.query, top_k=5)
     
     # Convert to format expected by RTI generator
     relevant_docs = [
@@ -496,22 +710,21 @@ async def generate_rti_response(request: RTIRequest):
     ]
     
     # Generate response
-    response = rti_generator.generate_response(
+    response = get_rti_generator().generate_response(
         query=request.query,
         relevant_docs=relevant_docs,
         applicant_name=request.applicant_name,
         response_type=request.response_type
     )
     
-    return {
-        "success": True,
-        "letter": response.letter_content,
-        "relevant_documents": response.relevant_documents,
-        "redacted_items": response.redacted_items,
-        "response_date": response.response_date,
-        "appeal_info": response.appeal_info,
-        "word_count": response.word_count
-    }
+    return RTIGenerateResponse(
+        letter=response.letter_content,
+        relevant_documents=response.relevant_documents,
+        redacted_items=response.redacted_items,
+        response_date=response.response_date,
+        appeal_info=response.appeal_info,
+        word_count=response.word_count
+    )
 
 
 # ========================
@@ -521,7 +734,8 @@ async def generate_rti_response(request: RTIRequest):
 @app.get("/blockchain/verify/{doc_id}")
 async def verify_document(doc_id: str, content: str = Query(...)):
     """Verify document integrity using blockchain"""
-    result = blockchain.verify_document(doc_id, content)
+    result = get_blockchain().verify_document(doc_id, content)
+    _invalidate_stats_cache()
     
     return {
         "success": True,
@@ -537,7 +751,7 @@ async def verify_document(doc_id: str, content: str = Query(...)):
 @app.get("/blockchain/history/{doc_id}")
 async def get_document_history(doc_id: str):
     """Get complete audit trail for a document"""
-    history = blockchain.get_document_history(doc_id)
+    history = get_blockchain().get_document_history(doc_id)
     
     if not history:
         raise HTTPException(status_code=404, detail="Document not found")
@@ -552,7 +766,7 @@ async def get_document_history(doc_id: str):
 @app.get("/blockchain/audit/{doc_id}")
 async def get_audit_report(doc_id: str):
     """Get comprehensive audit report"""
-    report = blockchain.get_audit_report(doc_id)
+    report = get_blockchain().get_audit_report(doc_id)
     
     if 'error' in report:
         raise HTTPException(status_code=404, detail=report['error'])
@@ -568,7 +782,7 @@ async def get_blockchain_stats():
     """Get blockchain statistics"""
     return {
         "success": True,
-        **blockchain.get_stats()
+        **get_blockchain().get_stats()
     }
 
 
@@ -584,14 +798,14 @@ async def export_document_pdf(doc_id: str, request: PDFExportRequest):
     Generates a downloadable PDF with extracted text
     """
     try:
-        pdf_bytes = generate_text_pdf(
+        pdf_chunks = generate_text_pdf_stream(
             text=request.text,
             doc_id=doc_id,
             title=request.title
         )
         
-        return Response(
-            content=pdf_bytes,
+        return StreamingResponse(
+            pdf_chunks,
             media_type="application/pdf",
             headers={
                 "Content-Disposition": f"attachment; filename=document_{doc_id}.pdf"
@@ -606,20 +820,20 @@ async def export_summary_pdf(doc_id: str, request: PDFExportRequest):
     """Export document summary as PDF"""
     try:
         # Generate summary first
-        summaries_result = summarizer.summarize_all_levels(request.text)
+        summaries_result = get_summarizer().summarize_all_levels(request.text)
         summaries = {
             level: {"content": s.content, "word_count": s.word_count}
             for level, s in summaries_result.items()
         }
         
-        pdf_bytes = generate_summary_pdf(
+        pdf_chunks = generate_summary_pdf_stream(
             text=request.text,
             summaries=summaries,
             doc_id=doc_id
         )
         
-        return Response(
-            content=pdf_bytes,
+        return StreamingResponse(
+            pdf_chunks,
             media_type="application/pdf",
             headers={
                 "Content-Disposition": f"attachment; filename=summary_{doc_id}.pdf"
@@ -659,8 +873,13 @@ async def get_analytics():
     
     Returns document processing statistics, category distribution, etc.
     """
-    doc_count = search_engine.get_document_count()
-    blockchain_stats = blockchain.get_stats()
+    return _cached_stats("analytics", _build_analytics)
+
+
+def _build_analytics() -> dict:
+    """Assemble the analytics payload"""
+    doc_count = get_search_engine().get_document_count()
+    blockchain_stats = get_blockchain().get_stats()
     
     # Category distribution (mock data - in production, track this)
     categories = {
@@ -703,12 +922,27 @@ async def chat_with_ai(request: ChatRequest):
     Example: "इस circular में deadline क्या है?"
     """
     try:
-        result = chat_with_document(
-            message=request.message,
-            document_text=request.document_text,
-            doc_id=request.doc_id
-        )
-        
+        # Without document text the answer depends on conversation history, so only
+        # document-scoped questions are cached
+        key = None
+        if request.document_text:
+            key = ("chat", _text_digest(request.message), _text_digest(request.document_text), request.doc_id)
+
+        result = _response_cache.get(key) if key else None
+        if result is not None:
+            _response_cache.move_to_end(key)
+            # Keep the chatbot's context in step with what a miss would have set
+            chatbot.set_document_context(request.document_text, request.doc_id)
+        else:
+            result = chat_with_document(
+                message=request.message,
+                document_text=request.document_text,
+                doc_id=request.doc_id
+            )
+            # Fallback answers are cheap and may stem from a transient API error
+            if key and chatbot.client and result['confidence'] >= 0.9:
+                _store_response(key, result)
+
         return {
             "success": True,
             **result
@@ -721,6 +955,37 @@ async def chat_with_ai(request: ChatRequest):
         }
 
 
+@app.post("/chat/stream")
+async def chat_with_ai_stream(request: ChatRequest):
+    """
+    Stream the chatbot answer as plain text while it is generated
+    
+    Same inputs as /chat; the first words arrive after the model's first token
+    instead of after the whole answer
+    """
+    return StreamingResponse(
+        stream_chat_with_document(
+            message=request.message,
+            document_text=request.document_text,
+            doc_id=request.doc_id
+        ),
+        media_type="text/plain; charset=utf-8"
+    )
+
+
+@app.post("/cache/invalidate")
+async def invalidate_response_cache():
+    """Drop cached /translate and /chat responses (e.g. after changing prompts or API keys)"""
+    cleared = len(_response_cache)
+    _response_cache.clear()
+    _invalidate_stats_cache()
+
+    return {
+        "success": True,
+        "cleared": cleared
+    }
+
+
 # ========================
 # NEW: Compliance Endpoints
 # ========================
@@ -784,6 +1049,7 @@ async def register_new_grievance(request: GrievanceRequest):
         department=request.department,
         citizen_name=request.citizen_name
     )
+    _invalidate_stats_cache()
     
     return {
         "success": True,
@@ -816,6 +1082,7 @@ async def grievance_statistics():
 async def update_grievance_status(grv_id: str, status: str, note: str = ""):
     """Update grievance status"""
     grievance = grievance_tracker.update_status(grv_id, status, note)
+    _invalidate_stats_cache()
     
     if not grievance:
         raise HTTPException(status_code=404, detail="Grievance not found")
@@ -857,6 +1124,7 @@ async def create_doc_workflow(request: WorkflowRequest):
         title=request.title,
         priority=request.priority
     )
+    _invalidate_stats_cache()
     
     return {
         "success": True,
@@ -892,6 +1160,15 @@ async def workflow_statistics():
 @app.on_event("startup")
 async def startup_event():
     """Initialize on startup"""
+    # Worker processes for OCR and other CPU-bound work
+    cpu_count = os.cpu_count() or 1
+    pages_per_worker = min(OCR_PAGES_PER_WORKER, cpu_count)
+    app.state.cpu_pool = ProcessPoolExecutor(
+        max_workers=cpu_count // pages_per_worker,
+        initializer=limit_ocr_workers,
+        initargs=(pages_per_worker,)
+    )
+
 # Start database
     from modules.database import init_db
     init_db()
@@ -901,8 +1178,7 @@ async def startup_event():
     print("    ई-फाइल साथी - सरकारी दस्तावेज़ AI प्रणाली")
     print("="*60)
     print(f"📂 Upload directory: {UPLOAD_DIR}")
-    print(f"📊 Indexed documents: {search_engine.get_document_count()}")
-    print(f"⛓️ Blockchain blocks: {blockchain.get_stats()['total_blocks']}")
+    print(f"⛓️ Blockchain blocks: {get_blockchain().get_stats()['total_blocks']}")
     print(f"📝 Active grievances: {get_grievance_stats()['total']}")
     print("="*60)
     print("🚀 Server ready at http://localhost:8000")
@@ -912,11 +1188,27 @@ async def startup_event():
     print("="*60 + "\n")
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Release worker processes"""
+    app.state.cpu_pool.shutdown(wait=False, cancel_futures=True)
+
+
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(
-        "main:app",
-        host="0.0.0.0",
-        port=8000,
-        reload=True
-    )
+    if DEV_MODE:
+        uvicorn.run(
+            "main:app",
+            host=HOST,
+            port=PORT,
+            reload=True
+        )
+    else:
+        uvicorn.run(
+            "main:app",
+            host=HOST,
+            port=PORT,
+            loop="uvloop",
+            http="httptools",
+            workers=WORKERS
+        )
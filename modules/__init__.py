@@ -10,7 +10,7 @@ from .blockchain import BlockchainVerifier
 
 # NEW: Hackathon Feature Modules
 from .chatbot import DocumentChatbot, chat_with_document
-from .compliance import DocumentComplianceChecker, check_document_compliance
+from .compliance import DocumentComplianceChecker, check_document_compliance, check_documents_compliance
 from .comparator import DocumentComparator, compare_documents
 from .grievance import GrievanceTracker, register_grievance, get_grievances
 from .workflow import WorkflowTracker, get_workflow_status, create_workflow
@@ -27,6 +27,7 @@ __all__ = [
     "chat_with_document",
     "DocumentComplianceChecker",
     "check_document_compliance",
+    "check_documents_compliance",
     "DocumentComparator",
     "compare_documents",
     "GrievanceTracker",
@@ -2,10 +2,16 @@
 Blockchain Verification Module for Government Document AI System
 Tamper-proof audit trail for document verification
 """
+import atexit
 import hashlib
 import json
+import os
+import threading
+import time
+import weakref
+from collections import defaultdict
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import BinaryIO, Dict, List, Optional, Union
 from dataclasses import dataclass, asdict
 from pathlib import Path
 
@@ -13,10 +19,64 @@ import sys
 sys.path.append(str(Path(__file__).parent.parent))
 from config import BLOCKCHAIN_DIR
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
 
-@dataclass
+# Appended blocks are pushed to the OS every LEDGER_FLUSH_EVERY events, and a
+# background thread flushes anything older than LEDGER_FLUSH_INTERVAL_SECONDS
+LEDGER_FLUSH_EVERY = 32
+LEDGER_FLUSH_INTERVAL_SECONDS = 1.0
+
+# Document content accepted for hashing
+Content = Union[str, bytes, BinaryIO]
+
+# hashlib's sha256 comes from OpenSSL, which picks SHA-NI / ARMv8 crypto
+# instructions at runtime; bind the constructor once for the hot paths
+_sha256 = hashlib.sha256
+
+
+def _dumps_line(data: Dict) -> bytes:
+    """Serialize one ledger record as a newline-terminated line"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(data, option=orjson.OPT_APPEND_NEWLINE)
+    return json.dumps(data).encode('utf-8') + b'\n'
+
+
+_loads_line = orjson.loads if ORJSON_AVAILABLE else json.loads
+
+
+def _raw_digest(hex_hash: str) -> bytes:
+    """Decode a stored hex hash; malformed values are kept as-is so they fail comparison"""
+    try:
+        return bytes.fromhex(hex_hash)
+    except ValueError:
+        return hex_hash.encode('utf-8')
+
+
+def hash_content(content: Content) -> str:
+    """
+    Generate SHA-256 hash of document content
+    
+    Args:
+        content: Text (hashed as UTF-8), raw bytes, or a binary file object,
+            which is read in chunks instead of being loaded into memory
+        
+    Returns:
+        Hex digest
+    """
+    if isinstance(content, str):
+        return _sha256(content.encode('utf-8')).hexdigest()
+    if isinstance(content, (bytes, bytearray, memoryview)):
+        return _sha256(content).hexdigest()
+    return hashlib.file_digest(content, 'sha256').hexdigest()
+
+
+@dataclass(frozen=True, slots=True)
 class Block:
-    """Blockchain block"""
+    """Blockchain block (immutable once hashed)"""
     index: int
     timestamp: str
     doc_id: str
@@ -27,6 +87,25 @@ class Block:
     hash: str
 
 
+def _block_from_record(record: Dict) -> Block:
+    """Build a Block from a ledger record, interning its repetitive strings"""
+    # Many blocks share a doc_id, user and one of a handful of actions; interning
+    # makes them one shared object each instead of a fresh string per block.
+    # Positional arguments skip the keyword matching of Block(**record), which
+    # is about half the per-block cost of loading
+    intern = sys.intern
+    return Block(
+        record['index'],
+        record['timestamp'],
+        intern(record['doc_id']),
+        record['doc_hash'],
+        intern(record['action']),
+        intern(record['user']),
+        record['previous_hash'],
+        record['hash']
+    )
+
+
 @dataclass
 class VerificationResult:
     """Document verification result"""
@@ -52,50 +131,69 @@ class BlockchainVerifier:
         Initialize blockchain verifier
         
         Args:
-            ledger_path: Path to blockchain ledger file
+            ledger_path: Path to append-only ledger file (one JSON block per line)
         """
-        self.ledger_path = ledger_path or (BLOCKCHAIN_DIR / "ledger.json")
+        self.ledger_path = ledger_path or (BLOCKCHAIN_DIR / "ledger.jsonl")
+        self._lock = threading.RLock()  # Serializes appends from worker threads
         self.chain: List[Block] = []
         self.document_index: Dict[str, Dict] = {}
+        # Raw digests of block hashes and back-links, parallel to the chain;
+        # hex stays the on-disk and API form
+        self._hashes: List[bytes] = []
+        self._prev_hashes: List[bytes] = []
+        # doc_id -> positions of its blocks in the chain
+        self._history_index: Dict[str, List[int]] = defaultdict(list)
+        # Blocks are immutable once written, so only blocks past this index need rehashing
+        self._verified_up_to = 0
         
         # Load existing chain
         self._load_chain()
+        self._ledger_fp = open(self.ledger_path, 'ab')
+        self._dirty = 0  # Events appended since the last flush
+        _register_for_flush(self)
         
         # Create genesis block if chain is empty
         if not self.chain:
             self._create_genesis_block()
     
-    def register_document(self, doc_id: str, content: str, user: str = "system") -> Block:
+    def register_document(self, doc_id: str, content: Content, user: str = "system") -> Block:
         """
         Register a new document on the blockchain
         
         Args:
             doc_id: Unique document identifier
-            content: Document content
+            content: Document content (text, bytes or binary file object)
             user: User registering the document
             
         Returns:
             Created block
         """
-        doc_hash = self._hash_content(content)
-        
-        block = self._add_block(
-            doc_id=doc_id,
-            doc_hash=doc_hash,
-            action="created",
-            user=user
-        )
-        
-        # Update document index
-        self.document_index[doc_id] = {
-            'original_hash': doc_hash,
-            'created_at': block.timestamp,
-            'created_by': user,
-            'access_count': 0,
-            'last_accessed': None
-        }
+        return self.register_document_prehashed(doc_id, self._hash_content(content), user)
+    
+    def register_document_prehashed(self, doc_id: str, doc_hash: str, user: str = "system") -> Block:
+        """
+        Register a document whose content hash was already computed
         
-        self._save_chain()
+        Args:
+            doc_id: Unique document identifier
+            doc_hash: SHA-256 hex digest from hash_content()
+            user: User registering the document
+            
+        Returns:
+            Created block
+        """
+        with self._lock:
+            block = self._add_block(
+                doc_id=doc_id,
+                doc_hash=doc_hash,
+                action="created",
+                user=user
+            )
+            
+            # Update document index
+            self._index_block(block)
+            
+            self._save_chain()
         return block
     
     def record_access(self, doc_id: str, user: str = "anonymous") -> Optional[Block]:
@@ -112,27 +210,27 @@ class BlockchainVerifier:
         if doc_id not in self.document_index:
             return None
         
-        block = self._add_block(
-            doc_id=doc_id,
-            doc_hash=self.document_index[doc_id]['original_hash'],
-            action="accessed",
-            user=user
-        )
-        
-        # Update access statistics
-        self.document_index[doc_id]['access_count'] += 1
-        self.document_index[doc_id]['last_accessed'] = block.timestamp
-        
-        self._save_chain()
+        with self._lock:
+            block = self._add_block(
+                doc_id=doc_id,
+                doc_hash=self.document_index[doc_id]['original_hash'],
+                action="accessed",
+                user=user
+            )
+            
+            # Update access statistics
+            self._index_block(block)
+            
+            self._save_chain()
         return block
     
-    def verify_document(self, doc_id: str, current_content: str) -> VerificationResult:
+    def verify_document(self, doc_id: str, current_content: Content) -> VerificationResult:
         """
         Verify document integrity
         
         Args:
             doc_id: Document identifier
-            current_content: Current document content
+            current_content: Current document content (text, bytes or binary file object)
             
         Returns:
             VerificationResult with verification details
@@ -157,13 +255,14 @@ class BlockchainVerifier:
         is_valid = current_hash == doc_info['original_hash']
         
         # Record verification
-        self._add_block(
-            doc_id=doc_id,
-            doc_hash=current_hash,
-            action="verified",
-            user="verification_system"
-        )
-        self._save_chain()
+        with self._lock:
+            self._add_block(
+                doc_id=doc_id,
+                doc_hash=current_hash,
+                action="verified",
+                user="verification_system"
+            )
+            self._save_chain()
         
         return VerificationResult(
             doc_id=doc_id,
@@ -187,17 +286,19 @@ class BlockchainVerifier:
         Returns:
             List of history entries
         """
+        with self._lock:
+            blocks = [self.chain[position] for position in self._history_index.get(doc_id, ())]
+        
         history = []
         
-        for block in self.chain:
-            if block.doc_id == doc_id:
-                history.append({
-                    'timestamp': block.timestamp,
-                    'action': block.action,
-                    'user': block.user,
-                    'hash': block.doc_hash[:16] + '...',
-                    'block_index': block.index
-                })
+        for block in blocks:
+            history.append({
+                'timestamp': block.timestamp,
+                'action': block.action,
+                'user': block.user,
+                'hash': block.doc_hash[:16] + '...',
+                'block_index': block.index
+            })
         
         return history
     
@@ -229,123 +330,201 @@ class BlockchainVerifier:
             'total_events': len(history)
         }
     
-    def _hash_content(self, content: str) -> str:
+    def _hash_content(self, content: Content) -> str:
         """Generate SHA-256 hash of content"""
-        return hashlib.sha256(content.encode('utf-8')).hexdigest()
+        return hash_content(content)
+    
+    @staticmethod
+    def _block_payload(block: Block) -> Dict:
+        """Fields covered by a block's hash"""
+        return {
+            'index': block.index,
+            'timestamp': block.timestamp,
+            'doc_id': block.doc_id,
+            'doc_hash': block.doc_hash,
+            'action': block.action,
+            'user': block.user,
+            'previous_hash': block.previous_hash
+        }
     
     def _hash_block(self, block_data: Dict) -> str:
         """Generate hash for a block"""
+        return self._block_digest(block_data).hex()
+    
+    @staticmethod
+    def _block_digest(block_data: Dict) -> bytes:
+        """Raw 32-byte SHA-256 of a block's canonical JSON"""
+        # Stays on stdlib json: its separators and ASCII escaping are what every
+        # existing block hash was computed over, and orjson output differs
         block_string = json.dumps(block_data, sort_keys=True)
-        return hashlib.sha256(block_string.encode()).hexdigest()
+        return _sha256(block_string.encode()).digest()
     
     def _create_genesis_block(self):
         """Create the first block in the chain"""
-        genesis = Block(
-            index=0,
-            timestamp=datetime.now().isoformat(),
-            doc_id="GENESIS",
-            doc_hash="0" * 64,
-            action="genesis",
-            user="system",
-            previous_hash="0" * 64,
-            hash=""
-        )
-        
-        genesis.hash = self._hash_block({
-            'index': genesis.index,
-            'timestamp': genesis.timestamp,
-            'doc_id': genesis.doc_id,
-            'doc_hash': genesis.doc_hash,
-            'action': genesis.action,
-            'user': genesis.user,
-            'previous_hash': genesis.previous_hash
-        })
+        payload = {
+            'index': 0,
+            'timestamp': datetime.now().isoformat(),
+            'doc_id': "GENESIS",
+            'doc_hash': "0" * 64,
+            'action': "genesis",
+            'user': "system",
+            'previous_hash': "0" * 64
+        }
+        genesis = Block(**payload, hash=self._hash_block(payload))
         
-        self.chain.append(genesis)
+        self._push_block(genesis)
+        self._append_to_ledger(genesis)
         self._save_chain()
     
     def _add_block(self, doc_id: str, doc_hash: str, action: str, user: str) -> Block:
         """Add a new block to the chain"""
         previous_block = self.chain[-1]
         
-        new_block = Block(
-            index=len(self.chain),
-            timestamp=datetime.now().isoformat(),
-            doc_id=doc_id,
-            doc_hash=doc_hash,
-            action=action,
-            user=user,
-            previous_hash=previous_block.hash,
-            hash=""
-        )
-        
-        new_block.hash = self._hash_block({
-            'index': new_block.index,
-            'timestamp': new_block.timestamp,
-            'doc_id': new_block.doc_id,
-            'doc_hash': new_block.doc_hash,
-            'action': new_block.action,
-            'user': new_block.user,
-            'previous_hash': new_block.previous_hash
-        })
+        payload = {
+            'index': len(self.chain),
+            'timestamp': datetime.now().isoformat(),
+            'doc_id': sys.intern(doc_id),
+            'doc_hash': doc_hash,
+            'action': sys.intern(action),
+            'user': sys.intern(user),
+            'previous_hash': previous_block.hash
+        }
+        new_block = Block(**payload, hash=self._hash_block(payload))
         
-        self.chain.append(new_block)
+        # The hash was just computed here, so a verified prefix stays verified
+        if self._verified_up_to == len(self.chain) - 1:
+            self._verified_up_to += 1
+        self._push_block(new_block)
+        self._append_to_ledger(new_block)
         return new_block
     
     def _verify_chain(self) -> bool:
-        """Verify the integrity of the entire chain"""
-        for i in range(1, len(self.chain)):
-            current = self.chain[i]
-            previous = self.chain[i - 1]
+        """Verify the integrity of the chain, rehashing only blocks not yet verified"""
+        # Appends from worker threads update the parallel arrays one after
+        # the other, so they are only read together under the lock
+        with self._lock:
+            chain = self.chain
+            start = self._verified_up_to
             
-            # Verify previous hash link
-            if current.previous_hash != previous.hash:
+            # Check every previous-hash link first; comparing the parallel arrays
+            # runs in C and catches reordered or dropped blocks without hashing
+            if self._prev_hashes[start + 1:] != self._hashes[start:-1]:
                 return False
             
-            # Verify current block hash
-            calculated_hash = self._hash_block({
-                'index': current.index,
-                'timestamp': current.timestamp,
-                'doc_id': current.doc_id,
-                'doc_hash': current.doc_hash,
-                'action': current.action,
-                'user': current.user,
-                'previous_hash': current.previous_hash
-            })
+            # Then recompute block hashes in one tight pass
+            hashes = self._hashes
+            block_digest = self._block_digest
+            block_payload = self._block_payload
+            for position in range(start + 1, len(chain)):
+                if hashes[position] != block_digest(block_payload(chain[position])):
+                    return False
             
-            if current.hash != calculated_hash:
-                return False
-        
-        return True
+            self._verified_up_to = max(len(chain) - 1, 0)
+            return True
+    
+    def _push_block(self, block: Block):
+        """Add a block to the in-memory chain and the per-document history index"""
+        self._history_index[block.doc_id].append(len(self.chain))
+        self.chain.append(block)
+        self._hashes.append(_raw_digest(block.hash))
+        self._prev_hashes.append(_raw_digest(block.previous_hash))
+    
+    def _append_to_ledger(self, block: Block):
+        """Write one block as a line at the end of the ledger"""
+        self._ledger_fp.write(_dumps_line(asdict(block)))
     
     def _save_chain(self):
-        """Save blockchain to disk"""
-        data = {
-            'chain': [asdict(block) for block in self.chain],
-            'document_index': self.document_index
-        }
+        """Mark an event as written; the ledger is flushed in batches, never rewritten"""
+        with self._lock:
+            self._dirty += 1
+            if self._dirty >= LEDGER_FLUSH_EVERY:
+                self.flush(fsync=False)
+    
+    def flush(self, fsync: bool = True):
+        """
+        Flush pending ledger writes
         
-        with open(self.ledger_path, 'w') as f:
-            json.dump(data, f, indent=2)
+        Args:
+            fsync: Also force the data onto disk (durability boundary)
+        """
+        with self._lock:
+            self._ledger_fp.flush()
+            if fsync:
+                os.fsync(self._ledger_fp.fileno())
+            self._dirty = 0
+    
+    def _index_block(self, block: Block):
+        """Apply a block's effect to the document index"""
+        if block.action == "created":
+            self.document_index[block.doc_id] = {
+                'original_hash': block.doc_hash,
+                'created_at': block.timestamp,
+                'created_by': block.user,
+                'access_count': 0,
+                'last_accessed': None
+            }
+        elif block.action == "accessed" and block.doc_id in self.document_index:
+            doc_info = self.document_index[block.doc_id]
+            doc_info['access_count'] += 1
+            doc_info['last_accessed'] = block.timestamp
     
     def _load_chain(self):
-        """Load blockchain from disk"""
+        """Load blockchain from disk, streaming the ledger line by line"""
+        legacy_path = self.ledger_path.with_suffix('.json')
+        if not self.ledger_path.exists() and legacy_path.exists():
+            self._migrate_legacy_ledger(legacy_path)
+        
         if self.ledger_path.exists():
             try:
-                with open(self.ledger_path, 'r') as f:
-                    data = json.load(f)
-                    
-                    self.chain = [
-                        Block(**block_data)
-                        for block_data in data.get('chain', [])
-                    ]
-                    self.document_index = data.get('document_index', {})
-                    
+                valid_bytes = 0
+                with open(self.ledger_path, 'rb') as f:
+                    for line in f:
+                        try:
+                            block = _block_from_record(_loads_line(line))
+                        except ValueError:
+                            if line.endswith(b'\n'):
+                                raise
+                            # Only the last line can lack its newline: a torn
+                            # write from a crash, safe to drop
+                            print(f"⚠ Ignoring incomplete ledger entry at byte {valid_bytes}")
+                            break
+                        self._push_block(block)
+                        self._index_block(block)
+                        valid_bytes += len(line)
+                
+                if valid_bytes < self.ledger_path.stat().st_size:
+                    os.truncate(self.ledger_path, valid_bytes)
+                self._verified_up_to = 0
+                
                 print(f"✓ Loaded blockchain with {len(self.chain)} blocks")
             except Exception as e:
-                print(f"Failed to load blockchain: {e}")
+                # Never append to a ledger that could not be read; keep it
+                # aside for inspection and start a new chain in its place
+                corrupt_path = self.ledger_path.with_name(
+                    f"{self.ledger_path.stem}.corrupt-{datetime.now():%Y%m%dT%H%M%S%f}{self.ledger_path.suffix}"
+                )
+                os.replace(self.ledger_path, corrupt_path)
+                print(f"Failed to load blockchain: {e}; moved the ledger to {corrupt_path.name}")
                 self.chain = []
                 self.document_index = {}
+                self._history_index.clear()
+                self._hashes = []
+                self._prev_hashes = []
+                self._verified_up_to = 0
+    
+    def _migrate_legacy_ledger(self, legacy_path: Path):
+        """Convert a pre-JSONL ledger.json into the append-only format"""
+        try:
+            with open(legacy_path, 'r') as f:
+                data = json.load(f)
+            
+            with open(self.ledger_path, 'wb') as out:
+                for block_data in data.get('chain', []):
+                    out.write(_dumps_line(block_data))
+            
+            print(f"✓ Migrated {legacy_path.name} to {self.ledger_path.name}")
+        except Exception as e:
+            print(f"⚠ Could not migrate legacy ledger: {e}")
     
     def get_stats(self) -> Dict:
         """Get blockchain statistics"""
@@ -357,7 +536,58 @@ class BlockchainVerifier:
         }
 
 
-def verify_document(doc_id: str, content: str) -> Dict:
+# Verifiers with an open ledger, flushed by one shared background thread
+_open_verifiers: "weakref.WeakSet[BlockchainVerifier]" = weakref.WeakSet()
+_flush_thread: Optional[threading.Thread] = None
+_flush_thread_lock = threading.Lock()
+
+
+def _flush_periodically():
+    """Background loop that flushes ledgers with pending writes"""
+    while True:
+        time.sleep(LEDGER_FLUSH_INTERVAL_SECONDS)
+        for verifier in list(_open_verifiers):
+            if verifier._dirty:
+                verifier.flush(fsync=False)
+
+
+def _register_for_flush(verifier: BlockchainVerifier):
+    """Track a verifier for periodic flushing, starting the flusher on first use"""
+    global _flush_thread
+    _open_verifiers.add(verifier)
+    with _flush_thread_lock:
+        if _flush_thread is None:
+            _flush_thread = threading.Thread(target=_flush_periodically, name="ledger-flush", daemon=True)
+            _flush_thread.start()
+
+
+@atexit.register
+def _flush_all_ledgers():
+    """Make pending blocks durable on interpreter exit"""
+    for verifier in list(_open_verifiers):
+        try:
+            verifier.flush(fsync=True)
+        except Exception as e:
+            print(f"⚠ Could not flush ledger {verifier.ledger_path}: {e}")
+
+
+# Process-wide verifier for the default ledger; a second instance appending
+# to the same file would fork the chain
+_verifier_singleton: Optional[BlockchainVerifier] = None
+_verifier_lock = threading.Lock()
+
+
+def get_verifier() -> BlockchainVerifier:
+    """Return the shared verifier for the default ledger, loading it on first use"""
+    global _verifier_singleton
+    if _verifier_singleton is None:
+        with _verifier_lock:
+            if _verifier_singleton is None:
+                _verifier_singleton = BlockchainVerifier()
+    return _verifier_singleton
+
+
+def verify_document(doc_id: str, content: Content) -> Dict:
     """
     Convenience function for document verification
     
@@ -368,8 +598,7 @@ def verify_document(doc_id: str, content: str) -> Dict:
     Returns:
         Verification result as dictionary
     """
-    verifier = BlockchainVerifier()
-    result = verifier.verify_document(doc_id, content)
+    result = get_verifier().verify_document(doc_id, content)
     
     return {
         'doc_id': result.doc_id,
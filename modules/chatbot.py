@@ -3,7 +3,8 @@ AI Chatbot Module for eFile Sathi
 Conversational AI for document queries in Hindi and English
 """
 import os
-from typing import List, Dict, Optional
+import re
+from typing import Iterator, List, Dict, Optional
 from dataclasses import dataclass
 
 try:
@@ -18,6 +19,69 @@ sys.path.append(str(Path(__file__).parent.parent))
 from config import PERPLEXITY_API_KEY, PERPLEXITY_BASE_URL, PERPLEXITY_MODEL, PERPLEXITY_FALLBACK_MODEL
 
 
+# Messages kept in conversation_history and sent with each prompt (3 turns)
+MAX_HISTORY_MESSAGES = 6
+
+# Characters of the document included in the system prompt
+MAX_PROMPT_CONTEXT_CHARS = 10000
+
+# Static instructions come first and the document last, so every prompt shares
+# an identical prefix that provider-side prompt caching can reuse
+_SYSTEM_PROMPT_TEMPLATE = """You are a helpful government document assistant for eFile Sathi (ई-फाइल साथी).
+You help government officers and citizens understand official documents.
+
+INSTRUCTIONS:
+1. Answer questions based on the document context below
+2. If asked in Hindi, respond in Hindi. If asked in English, respond in English.
+3. Be precise and cite specific sections when possible
+4. For dates, amounts, and deadlines, be very accurate
+5. If information is not in the document, say so clearly
+6. Use government terminology appropriately
+7. Be respectful and professional
+
+EXAMPLE RESPONSES:
+- For deadline questions: "इस दस्तावेज़ में अंतिम तिथि 15 जनवरी 2025 है।"
+- For summary requests: "This circular directs all departments to..."
+- For unclear queries: "I couldn't find specific information about that in this document."
+
+CURRENT DOCUMENT CONTEXT:
+{context}
+"""
+
+# Suggested questions returned with every chat response
+_SUGGESTIONS = (
+    "What is the main purpose of this document?",
+    "इस दस्तावेज़ का मुख्य उद्देश्य क्या है?",
+    "What are the key deadlines?",
+    "Are there any financial amounts mentioned?"
+)
+
+# Patterns and keywords for the offline fallback, compiled once
+_DATE_RE = re.compile(
+    r'\d{1,2}[/-]\d{1,2}[/-]\d{2,4}|\d{1,2}\s+(?:jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\s+\d{4}',
+    re.IGNORECASE
+)
+_AMOUNT_RE = re.compile(
+    r'₹\s*[\d,]+(?:\.\d{2})?|Rs\.?\s*[\d,]+(?:\.\d{2})?|\d+\s*(?:crore|lakh|करोड़|लाख)',
+    re.IGNORECASE
+)
+_DATE_KEYWORDS = ('deadline', 'date', 'अंतिम', 'तिथि', 'तारीख')
+_SUMMARY_KEYWORDS = ('summary', 'सारांश', 'संक्षेप')
+_AMOUNT_KEYWORDS = ('amount', 'money', 'rupees', 'रुपये', 'राशि', 'बजट')
+
+
+def _contains_devanagari(text: str) -> bool:
+    """
+    Check for any Devanagari character (U+0900-U+097F)
+    
+    In UTF-8 that block is exactly the sequences starting E0 A4 / E0 A5, and
+    E0 only ever appears as a lead byte, so a bytes substring search (memchr
+    fast path) replaces a per-character Python loop
+    """
+    encoded = text.encode('utf-8')
+    return b'\xe0\xa4' in encoded or b'\xe0\xa5' in encoded
+
+
 @dataclass
 class ChatMessage:
     """Chat message"""
@@ -47,12 +111,16 @@ class DocumentChatbot:
         self.client = None
         self.conversation_history: List[Dict] = []
         self.document_context: str = ""
+        self._reset_context_cache()
         
         if PERPLEXITY_AVAILABLE and self.api_key:
             self.client = OpenAI(api_key=self.api_key, base_url=PERPLEXITY_BASE_URL)
     
     def set_document_context(self, text: str, doc_id: str = "", title: str = ""):
         """Set the document context for queries"""
+        # /chat resends the same document each turn; keep derived data when it matches
+        if text != self.document_context:
+            self._reset_context_cache()
         self.document_context = text
         self.doc_id = doc_id
         self.doc_title = title
@@ -60,6 +128,38 @@ class DocumentChatbot:
         # Reset conversation with new context
         self.conversation_history = []
     
+    def _reset_context_cache(self):
+        """Forget values derived from the previous document context"""
+        self._summary_cache: Optional[str] = None
+        self._date_matches: Optional[List[str]] = None
+        self._amount_matches: Optional[List[str]] = None
+        self._system_prompt: Optional[str] = None
+    
+    def _document_system_prompt(self) -> str:
+        """System prompt with the (truncated) document, built once per document"""
+        if self._system_prompt is None:
+            context = self.document_context[:MAX_PROMPT_CONTEXT_CHARS] if self.document_context else "No document uploaded yet."
+            self._system_prompt = _SYSTEM_PROMPT_TEMPLATE.format(context=context)
+        return self._system_prompt
+    
+    def _document_summary(self) -> str:
+        """First 200 words of the document, computed once per document"""
+        if self._summary_cache is None:
+            self._summary_cache = ' '.join(self.document_context.split()[:200]) + '...'
+        return self._summary_cache
+    
+    def _document_dates(self) -> List[str]:
+        """Dates found in the document, computed once per document"""
+        if self._date_matches is None:
+            self._date_matches = _DATE_RE.findall(self.document_context)
+        return self._date_matches
+    
+    def _document_amounts(self) -> List[str]:
+        """Amounts found in the document, computed once per document"""
+        if self._amount_matches is None:
+            self._amount_matches = _AMOUNT_RE.findall(self.document_context)
+        return self._amount_matches
+    
     def chat(self, user_message: str) -> ChatResponse:
         """
         Process user message and generate response
@@ -71,46 +171,80 @@ class DocumentChatbot:
             ChatResponse with answer and metadata
         """
         # Detect language (simple heuristic)
-        is_hindi = any('\u0900' <= char <= '\u097F' for char in user_message)
+        is_hindi = _contains_devanagari(user_message)
         
         if self.client:
             return self._chat_with_perplexity(user_message, is_hindi)
         else:
             return self._chat_fallback(user_message, is_hindi)
     
-    def _chat_with_perplexity(self, user_message: str, is_hindi: bool) -> ChatResponse:
-        """Use Perplexity for intelligent responses"""
-        system_prompt = f"""You are a helpful government document assistant for eFile Sathi (ई-फाइल साथी).
-You help government officers and citizens understand official documents.
-
-CURRENT DOCUMENT CONTEXT:
-{self.document_context[:10000] if self.document_context else "No document uploaded yet."}
-
-INSTRUCTIONS:
-1. Answer questions based on the document context above
-2. If asked in Hindi, respond in Hindi. If asked in English, respond in English.
-3. Be precise and cite specific sections when possible
-4. For dates, amounts, and deadlines, be very accurate
-5. If information is not in the document, say so clearly
-6. Use government terminology appropriately
-7. Be respectful and professional
-
-EXAMPLE RESPONSES:
-- For deadline questions: "इस दस्तावेज़ में अंतिम तिथि 15 जनवरी 2025 है।"
-- For summary requests: "This circular directs all departments to..."
-- For unclear queries: "I couldn't find specific information about that in this document."
-"""
+    def chat_stream(self, user_message: str) -> Iterator[str]:
+        """
+        Process user message and yield the answer as it is generated
+        
+        Args:
+            user_message: User's question in Hindi or English
+            
+        Returns:
+            Iterator over pieces of the answer text
+        """
+        is_hindi = _contains_devanagari(user_message)
+        
+        if not self.client:
+            yield self._chat_fallback(user_message, is_hindi).message
+            return
+        
+        try:
+            stream = self.client.chat.completions.create(
+                model=PERPLEXITY_MODEL,
+                messages=self._build_messages(user_message),
+                temperature=0.7,
+                stream=True
+            )
+        except Exception as e:
+            print(f"Perplexity error: {e}")
+            yield self._chat_fallback(user_message, is_hindi).message
+            return
+        
+        parts = []
+        try:
+            for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    parts.append(delta)
+                    yield delta
+        except Exception as e:
+            # Part of the answer is already on the wire; just stop here
+            print(f"Perplexity stream error: {e}")
         
+        if parts:
+            self._remember(user_message, ''.join(parts))
+    
+    def _build_messages(self, user_message: str) -> List[Dict]:
+        """Build the prompt messages for a user turn"""
         # Build conversation
-        messages = [{"role": "system", "content": system_prompt}]
+        messages = [{"role": "system", "content": self._document_system_prompt()}]
         
-        # Add conversation history
-        for msg in self.conversation_history[-6:]:
-            messages.append(msg)
+        # Add conversation history (already capped at MAX_HISTORY_MESSAGES)
+        messages.extend(self.conversation_history)
         
         # Add current message
         messages.append({"role": "user", "content": user_message})
         
+        return messages
+    
+    def _remember(self, user_message: str, assistant_message: str):
+        """Append a turn to the history, trimming it in place to the cap"""
+        self.conversation_history.append({"role": "user", "content": user_message})
+        self.conversation_history.append({"role": "assistant", "content": assistant_message})
+        del self.conversation_history[:-MAX_HISTORY_MESSAGES]
+    
+    def _chat_with_perplexity(self, user_message: str, is_hindi: bool) -> ChatResponse:
+        """Use Perplexity for intelligent responses"""
+        messages = self._build_messages(user_message)
+        
         try:
             response = self.client.chat.completions.create(
                 model=PERPLEXITY_MODEL,
@@ -121,8 +255,7 @@ EXAMPLE RESPONSES:
             assistant_message = response.choices[0].message.content
             
             # Update history
-            self.conversation_history.append({"role": "user", "content": user_message})
-            self.conversation_history.append({"role": "assistant", "content": assistant_message})
+            self._remember(user_message, assistant_message)
             
             return ChatResponse(
                 message=assistant_message,
@@ -146,11 +279,9 @@ EXAMPLE RESPONSES:
             else:
                 response = "Please upload a document first. Then I can answer your questions about it."
         
-        elif any(word in query_lower for word in ['deadline', 'date', 'अंतिम', 'तिथि', 'तारीख']):
+        elif any(word in query_lower for word in _DATE_KEYWORDS):
             # Extract dates from document
-            import re
-            dates = re.findall(r'\d{1,2}[/-]\d{1,2}[/-]\d{2,4}|\d{1,2}\s+(?:jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\s+\d{4}', 
-                              self.document_context, re.IGNORECASE)
+            dates = self._document_dates()
             if dates:
                 if is_hindi:
                     response = f"इस दस्तावेज़ में निम्नलिखित तिथियां पाई गई हैं: {', '.join(dates[:5])}"
@@ -162,19 +293,16 @@ EXAMPLE RESPONSES:
                 else:
                     response = "No specific dates found in this document."
         
-        elif any(word in query_lower for word in ['summary', 'सारांश', 'संक्षेप']):
+        elif any(word in query_lower for word in _SUMMARY_KEYWORDS):
             # Return first 200 words as summary
-            words = self.document_context.split()[:200]
-            summary = ' '.join(words) + '...'
+            summary = self._document_summary()
             if is_hindi:
                 response = f"दस्तावेज़ का संक्षिप्त विवरण:\n{summary}"
             else:
                 response = f"Brief document summary:\n{summary}"
         
-        elif any(word in query_lower for word in ['amount', 'money', 'rupees', 'रुपये', 'राशि', 'बजट']):
-            import re
-            amounts = re.findall(r'₹\s*[\d,]+(?:\.\d{2})?|Rs\.?\s*[\d,]+(?:\.\d{2})?|\d+\s*(?:crore|lakh|करोड़|लाख)', 
-                                self.document_context, re.IGNORECASE)
+        elif any(word in query_lower for word in _AMOUNT_KEYWORDS):
+            amounts = self._document_amounts()
             if amounts:
                 if is_hindi:
                     response = f"इस दस्तावेज़ में निम्नलिखित राशियां पाई गई हैं: {', '.join(amounts[:5])}"
@@ -205,15 +333,7 @@ EXAMPLE RESPONSES:
     
     def get_suggestions(self) -> List[str]:
         """Get suggested questions based on document context"""
-        suggestions = [
-            "What is the main purpose of this document?",
-            "इस दस्तावेज़ का मुख्य उद्देश्य क्या है?",
-            "What are the key deadlines?",
-            "Are there any financial amounts mentioned?",
-            "Who is responsible for implementation?",
-            "क्या कोई अंतिम तिथि है?"
-        ]
-        return suggestions[:4]
+        return list(_SUGGESTIONS)
 
 
 # Singleton instance
@@ -246,6 +366,24 @@ def chat_with_document(message: str, document_text: str = "", doc_id: str = "")
     }
 
 
+def stream_chat_with_document(message: str, document_text: str = "", doc_id: str = "") -> Iterator[str]:
+    """
+    Convenience function for streaming chatbot interaction
+    
+    Args:
+        message: User message
+        document_text: Optional document context
+        doc_id: Optional document ID
+        
+    Returns:
+        Iterator over pieces of the answer text
+    """
+    if document_text:
+        chatbot.set_document_context(document_text, doc_id)
+    
+    return chatbot.chat_stream(message)
+
+
 if __name__ == "__main__":
     print("Chatbot Module Test")
     print("-" * 50)
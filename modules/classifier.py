@@ -2,10 +2,33 @@
 Document Classifier Module for eFile Sathi
 Classifies government documents into categories based on content analysis
 """
+import hashlib
+import heapq
+import os
 import re
+import threading
+from collections import OrderedDict
 from enum import Enum
-from typing import Tuple, List, Dict
-from dataclasses import dataclass
+from typing import Tuple, List, Dict, Optional, Set
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass, replace
+from pathlib import Path
+
+try:
+    import hyperscan
+    HYPERSCAN_AVAILABLE = True
+except ImportError:
+    HYPERSCAN_AVAILABLE = False
+
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+
+import sys
+sys.path.append(str(Path(__file__).parent.parent))
+from config import DATA_DIR
 
 
 class DocumentCategory(Enum):
@@ -23,7 +46,7 @@ class DocumentCategory(Enum):
     OTHER = "other"
 
 
-@dataclass
+@dataclass(slots=True)
 class ClassificationResult:
     """Classification result with confidence"""
     category: DocumentCategory
@@ -80,26 +103,230 @@ CATEGORY_PATTERNS: Dict[DocumentCategory, List[str]] = {
 }
 
 
+# Recent results, keyed by a digest of the classified text
+MAX_CACHED_CLASSIFICATIONS = 256
+
+
+# A pattern that is just \b<plain word>\b, matchable as a literal string
+_LITERAL_WORD_PATTERN = re.compile(r'^\\b([^\\\[\](){}?*+|.^$]+)\\b$')
+
+
+# Characters that re's IGNORECASE equates with an ASCII letter but that
+# str.lower() leaves alone (or expands), mapped so the prefilters still see them
+_PREFILTER_FOLD = str.maketrans({'\u0130': 'i', '\u0131': 'i', '\u017f': 's'})
+
+
+# re's \s (str.isspace()) spelled out for Hyperscan, whose \s is narrower;
+# no whitespace character lies above U+3000
+_RE_WHITESPACE = '[' + ''.join(
+    f'\\x{{{code:x}}}' for code in range(0x3001) if chr(code).isspace()
+) + ']'
+
+
+def _prefilter_text(text: str) -> str:
+    """Lowercase text for the prefilters without losing any IGNORECASE match"""
+    return text.translate(_PREFILTER_FOLD).lower()
+
+
+def _hyperscan_expression(pattern: str) -> bytes:
+    """
+    Encode a category pattern as a Hyperscan prefilter
+    
+    Hyperscan's word boundaries only know ASCII word characters, so they are
+    dropped, and its whitespace class is widened to re's. The expression then
+    fires wherever the pattern could match, and re has the final say
+    """
+    return pattern.replace(r'\b', '').replace(r'\s', _RE_WHITESPACE).encode('utf-8')
+
+
+def _load_hyperscan_db(expressions: List[bytes], flags: int):
+    """
+    Load the compiled Hyperscan database from disk, compiling it on a miss
+    
+    Compiling takes ~0.1s while deserializing takes well under 1ms, which
+    matters for every worker process that starts. The file name carries a
+    digest of the patterns, flags and Hyperscan version, so a stale
+    database is never loaded
+    
+    Args:
+        expressions: Encoded patterns, in pattern id order
+        flags: Compile flags applied to every pattern
+        
+    Returns:
+        Block-mode hyperscan.Database
+    """
+    digest = hashlib.blake2b(digest_size=8)
+    for expression in expressions:
+        digest.update(expression + b'\0')
+    digest.update(f"{flags}:{getattr(hyperscan, '__version__', '')}".encode())
+    db_path = DATA_DIR / f"classifier_{digest.hexdigest()}.hsdb"
+    
+    if db_path.exists():
+        try:
+            db = hyperscan.loadb(db_path.read_bytes(), hyperscan.HS_MODE_BLOCK)
+            # A deserialized database comes without scratch space
+            db.scratch = hyperscan.Scratch(db)
+            return db
+        except Exception as e:
+            print(f"⚠ Could not load cached Hyperscan database, recompiling: {e}")
+    
+    db = hyperscan.Database()
+    db.compile(
+        expressions=expressions,
+        ids=list(range(len(expressions))),
+        elements=len(expressions),
+        flags=[flags] * len(expressions)
+    )
+    try:
+        # Write then rename so concurrent workers never read a partial file
+        tmp_path = db_path.with_suffix(f".{os.getpid()}.tmp")
+        tmp_path.write_bytes(hyperscan.dumpb(db))
+        os.replace(tmp_path, db_path)
+    except OSError as e:
+        print(f"⚠ Could not cache Hyperscan database: {e}")
+    return db
+
+
+def _copy_result(result: ClassificationResult) -> ClassificationResult:
+    """Copy a cached result so callers cannot mutate the cached lists"""
+    return replace(
+        result,
+        keywords_found=list(result.keywords_found),
+        suggested_categories=list(result.suggested_categories)
+    )
+
+
 class DocumentClassifier:
     """Classifies government documents into categories"""
     
-    def __init__(self):
-        self.patterns = {
-            category: [re.compile(pattern, re.IGNORECASE) 
-                      for pattern in patterns]
-            for category, patterns in CATEGORY_PATTERNS.items()
-        }
+    def __init__(self, backend: Optional[str] = None):
+        """
+        Args:
+            backend: Pattern prefilter, "hyperscan", "ahocorasick" or "re";
+                the fastest installed one when omitted. Results are the same
+                whichever is used
+        """
+        if backend is None:
+            backend = ("hyperscan" if HYPERSCAN_AVAILABLE else
+                       "ahocorasick" if AHOCORASICK_AVAILABLE else "re")
+        
+        # Each pattern keeps its own compiled regex so every pattern counts its
+        # hits independently, even where two patterns match the same text;
+        # the group name "<CATEGORY>__<i>" identifies a pattern across backends
+        self.patterns: List[Tuple[str, DocumentCategory, "re.Pattern[str]"]] = []
+        self._group_category: Dict[str, DocumentCategory] = {}
+        for category, patterns in CATEGORY_PATTERNS.items():
+            for i, pattern in enumerate(patterns):
+                group = f"{category.name}__{i}"
+                self._group_category[group] = category
+                self.patterns.append((group, category, re.compile(pattern, re.IGNORECASE)))
+        
+        self._cache: "OrderedDict[bytes, ClassificationResult]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        
+        # With Hyperscan the same patterns go into one SIMD database that
+        # reports which of them occur; the database's scratch space is not
+        # safe to share across threads
+        self._hs_groups: List[str] = list(self._group_category)
+        self._hs_db = None
+        self._hs_lock = threading.Lock()
+        if backend == "hyperscan":
+            try:
+                flags = (hyperscan.HS_FLAG_CASELESS | hyperscan.HS_FLAG_UTF8 |
+                         hyperscan.HS_FLAG_SINGLEMATCH)
+                expressions = [
+                    _hyperscan_expression(pattern)
+                    for patterns in CATEGORY_PATTERNS.values() for pattern in patterns
+                ]
+                self._hs_db = _load_hyperscan_db(expressions, flags)
+            except Exception as e:
+                print(f"⚠ Hyperscan unavailable, using re for classification: {e}")
+        
+        # Without Hyperscan, plain \bword\b patterns go into an Aho-Corasick
+        # automaton; the remaining regexes are always run
+        self._automaton = None
+        self._regex_groups: List[str] = []
+        if backend == "hyperscan" and self._hs_db is None:
+            backend = "ahocorasick" if AHOCORASICK_AVAILABLE else "re"
+        if backend == "ahocorasick":
+            automaton = ahocorasick.Automaton()
+            for group, _, compiled in self.patterns:
+                literal = _LITERAL_WORD_PATTERN.match(compiled.pattern)
+                if literal:
+                    word = literal.group(1).lower()
+                    automaton.add_word(word, group)
+                else:
+                    self._regex_groups.append(group)
+            automaton.make_automaton()
+            self._automaton = automaton
+    
+    def _candidate_groups(self, text: str) -> Optional[Set[str]]:
+        """
+        Narrow down the patterns worth running over the text
+        
+        Returns:
+            Groups of the patterns that may match, or None to run them all
+        """
+        if self._hs_db is not None:
+            return self._scan_hyperscan(text)
+        if self._automaton is not None:
+            return self._scan_literals(text)
+        return None
+    
+    def _scan_hyperscan(self, text: str) -> Set[str]:
+        """Find the patterns that may match with the Hyperscan database"""
+        groups: Set[str] = set()
+        
+        def on_match(pattern_id, start, end, flags, context):
+            groups.add(self._hs_groups[pattern_id])
+        
+        with self._hs_lock:
+            self._hs_db.scan(_prefilter_text(text).encode('utf-8'), match_event_handler=on_match)
+        return groups
+    
+    def _scan_literals(self, text: str) -> Set[str]:
+        """
+        Find the literal words with the automaton; the other patterns always run
+        
+        Word boundaries are left to the regex run afterwards, so a literal
+        found inside a longer word only costs one extra finditer
+        """
+        groups = set(self._regex_groups)
+        for _, group in self._automaton.iter(_prefilter_text(text)):
+            groups.add(group)
+        return groups
     
     def classify(self, text: str) -> ClassificationResult:
         """
         Classify a document based on its text content
         
+        Identical texts (e.g. retried uploads) are served from an LRU cache;
+        every caller gets its own copy of the cached result
+        
         Args:
             text: Document text to classify
             
         Returns:
             ClassificationResult with category and confidence
         """
+        key = hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest() if text else b''
+        with self._cache_lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                return _copy_result(cached)
+        
+        result = self._classify(text)
+        
+        with self._cache_lock:
+            self._cache[key] = result
+            self._cache.move_to_end(key)
+            while len(self._cache) > MAX_CACHED_CLASSIFICATIONS:
+                self._cache.popitem(last=False)
+        return _copy_result(result)
+    
+    def _classify(self, text: str) -> ClassificationResult:
+        """Run the pattern scan and scoring for classify()"""
         if not text or len(text.strip()) < 10:
             return ClassificationResult(
                 category=DocumentCategory.OTHER,
@@ -112,27 +339,32 @@ class DocumentClassifier:
         scores: Dict[DocumentCategory, float] = {}
         keywords_by_category: Dict[DocumentCategory, List[str]] = {}
         
-        text_lower = text.lower()
         text_length = len(text)
         
-        for category, patterns in self.patterns.items():
-            matches = []
-            score = 0.0
-            
-            for pattern in patterns:
-                found = pattern.findall(text)
-                if found:
-                    matches.extend(found)
-                    # Weight by frequency and position
-                    first_match = pattern.search(text)
-                    if first_match:
-                        # Earlier matches get higher weight
-                        position_weight = 1.0 - (first_match.start() / text_length) * 0.5
-                        score += len(found) * position_weight
-            
-            if matches:
-                scores[category] = score
-                keywords_by_category[category] = list(set(matches))[:5]
+        # Only patterns the backend could not rule out are run; each one is
+        # counted on its own, exactly like a per-pattern findall
+        candidates = self._candidate_groups(text)
+        # At most 5 distinct keywords are reported per category, so stop collecting there
+        unique_matches: Dict[DocumentCategory, Dict[str, None]] = {}
+        
+        for group, category, pattern in self.patterns:
+            if candidates is not None and group not in candidates:
+                continue
+            count = 0
+            for match in pattern.finditer(text):
+                if count == 0:
+                    first_position = match.start()
+                count += 1
+                keywords = unique_matches.setdefault(category, {})
+                if len(keywords) < 5:
+                    keywords[match.group()] = None
+            if count:
+                # Weight by frequency and position; earlier matches get higher weight
+                position_weight = 1.0 - (first_position / text_length) * 0.5
+                scores[category] = scores.get(category, 0.0) + count * position_weight
+        
+        for category, keywords in unique_matches.items():
+            keywords_by_category[category] = list(keywords)
         
         if not scores:
             return ClassificationResult(
@@ -149,18 +381,12 @@ class DocumentClassifier:
             for cat, score in scores.items()
         }
         
-        # Get top category
-        top_category = max(normalized_scores.items(), key=lambda x: x[1])
-        
-        # Get suggestions (top 3 excluding the main one)
-        sorted_scores = sorted(
-            normalized_scores.items(), 
-            key=lambda x: x[1], 
-            reverse=True
-        )
+        # Top category plus up to 3 suggestions in one partial sort
+        top_scores = heapq.nlargest(4, normalized_scores.items(), key=lambda x: x[1])
+        top_category = top_scores[0]
         suggestions = [
             (cat.value, round(score, 2)) 
-            for cat, score in sorted_scores[1:4]
+            for cat, score in top_scores[1:]
             if score > 0.1
         ]
         
@@ -211,3 +437,32 @@ def classify_document(text: str) -> dict:
         'suggested_categories': result.suggested_categories,
         'display_name': classifier.get_category_display_name(result.category)
     }
+
+
+# Smaller batches run in-process; starting workers would cost more than it saves
+MIN_PARALLEL_BATCH = 16
+
+
+def classify_documents(texts: List[str], executor: Optional[Executor] = None) -> List[dict]:
+    """
+    Classify a batch of documents across CPU cores
+    
+    Each worker process builds its own module singleton on import, so the
+    patterns are compiled once per worker rather than once per document
+    
+    Args:
+        texts: Document texts
+        executor: Process pool to reuse (e.g. the app's CPU pool); a
+            temporary one is created when omitted
+        
+    Returns:
+        One result dictionary per text, in input order
+    """
+    if len(texts) < MIN_PARALLEL_BATCH:
+        return [classify_document(text) for text in texts]
+    
+    chunksize = max(1, len(texts) // ((os.cpu_count() or 1) * 4))
+    if executor is not None:
+        return list(executor.map(classify_document, texts, chunksize=chunksize))
+    with ProcessPoolExecutor() as pool:
+        return list(pool.map(classify_document, texts, chunksize=chunksize))
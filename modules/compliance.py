@@ -2,11 +2,14 @@
 Document Compliance Checker Module for eFile Sathi
 Validates government documents against standards and mandatory requirements
 """
-import re
-from typing import List, Dict, Tuple
+import os
+from typing import List, Dict, Tuple, Optional
+from concurrent.futures import Executor, ProcessPoolExecutor
 from dataclasses import dataclass
 from enum import Enum
 
+from modules.regex_engine import compile_pattern
+
 
 class ComplianceLevel(Enum):
     """Compliance severity levels"""
@@ -16,7 +19,7 @@ class ComplianceLevel(Enum):
     INFO = "info"
 
 
-@dataclass
+@dataclass(slots=True)
 class ComplianceCheck:
     """Individual compliance check result"""
     name: str
@@ -26,7 +29,7 @@ class ComplianceCheck:
     details: str = ""
 
 
-@dataclass
+@dataclass(slots=True)
 class ComplianceReport:
     """Complete compliance report"""
     score: float  # 0-100
@@ -137,6 +140,19 @@ class DocumentComplianceChecker:
             r'DSC',
             r'Certificate\s+Serial\s+No'
         ]
+        
+        # Compile every pattern once instead of on each check_compliance call
+        for field_config in self.mandatory_patterns.values():
+            field_config['compiled'] = [
+                compile_pattern(pattern) for pattern in field_config['patterns']
+            ]
+        self.format_checks = [
+            (check_name, compile_pattern(pattern), message)
+            for check_name, pattern, message in self.format_checks
+        ]
+        self.digital_signature_patterns = [
+            compile_pattern(pattern) for pattern in self.digital_signature_patterns
+        ]
     
     def check_compliance(self, text: str) -> ComplianceReport:
         """
@@ -149,13 +165,12 @@ class DocumentComplianceChecker:
             ComplianceReport with detailed results
         """
         checks: List[ComplianceCheck] = []
-        text_lower = text.lower()
         
         # Check mandatory fields
         for field_name, field_config in self.mandatory_patterns.items():
             found = False
-            for pattern in field_config['patterns']:
-                if re.search(pattern, text, re.IGNORECASE):
+            for pattern in field_config['compiled']:
+                if pattern.search(text):
                     found = True
                     break
             
@@ -169,7 +184,7 @@ class DocumentComplianceChecker:
         
         # Check format elements
         for check_name, pattern, message in self.format_checks:
-            found = bool(re.search(pattern, text, re.IGNORECASE))
+            found = bool(pattern.search(text))
             checks.append(ComplianceCheck(
                 name=check_name,
                 passed=found,
@@ -180,7 +195,7 @@ class DocumentComplianceChecker:
         
         # Check for digital signature
         has_digital_signature = any(
-            re.search(pattern, text, re.IGNORECASE) 
+            pattern.search(text)
             for pattern in self.digital_signature_patterns
         )
         
@@ -288,6 +303,35 @@ def check_document_compliance(text: str) -> dict:
     }
 
 
+# Below this many documents the batch is checked in-process
+MIN_PARALLEL_BATCH = 16
+
+
+def check_documents_compliance(texts: List[str], executor: Optional[Executor] = None) -> List[dict]:
+    """
+    Check compliance of a batch of documents across CPU cores
+    
+    Workers import this module and reuse its compliance_checker for every
+    document in their chunk
+    
+    Args:
+        texts: Document texts
+        executor: Process pool to reuse (e.g. the app's CPU pool); a
+            temporary one is created when omitted
+        
+    Returns:
+        One result dictionary per text, in input order
+    """
+    if len(texts) < MIN_PARALLEL_BATCH:
+        return [check_document_compliance(text) for text in texts]
+    
+    chunksize = max(1, len(texts) // ((os.cpu_count() or 1) * 4))
+    if executor is not None:
+        return list(executor.map(check_document_compliance, texts, chunksize=chunksize))
+    with ProcessPoolExecutor() as pool:
+        return list(pool.map(check_document_compliance, texts, chunksize=chunksize))
+
+
 if __name__ == "__main__":
     print("Compliance Checker Module Test")
     print("-" * 50)
@@ -1,21 +1,34 @@
 """
 Database Module for eFile Sathi
-Uses Supabase for cloud-based PostgreSQL storage
+Uses Supabase for cloud-based PostgreSQL storage, with SQLite as local fallback
 """
-import os
 import json
+import threading
+from contextlib import contextmanager
 from pathlib import Path
 from datetime import datetime
 from typing import List, Dict, Any, Optional
 
-from dotenv import load_dotenv
+import sys
+sys.path.append(str(Path(__file__).parent.parent))
+from config import SUPABASE_URL, SUPABASE_KEY
 
-# Load environment variables
-load_dotenv()
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
 
-# Supabase configuration
-SUPABASE_URL = os.getenv("SUPABASE_URL", "")
-SUPABASE_KEY = os.getenv("SUPABASE_KEY", "")
+
+def dumps_json(data: Any) -> str:
+    """Serialize a value for a *_json text column"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
+    return json.dumps(data)
+
+
+# orjson.loads accepts str, so stored columns decode without re-encoding
+loads_json = orjson.loads if ORJSON_AVAILABLE else json.loads
 
 # Initialize Supabase client
 supabase = None
@@ -51,20 +64,96 @@ import sqlite3
 
 DB_PATH = Path('data/digifest.db')
 
+# Per-connection settings; with WAL, synchronous=NORMAL only syncs at
+# checkpoints instead of on every commit. The busy timeout comes from
+# sqlite3.connect's default 5s timeout
+_CONNECTION_PRAGMAS = (
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -20000",
+)
+
+
+def _apply_pragmas(conn: sqlite3.Connection):
+    """Apply the per-connection PRAGMAs"""
+    for pragma in _CONNECTION_PRAGMAS:
+        conn.execute(pragma)
+
+
 def get_db_connection():
     """Get SQLite database connection (for legacy modules like grievance, workflow)"""
     DB_PATH.parent.mkdir(parents=True, exist_ok=True)
     conn = sqlite3.connect(DB_PATH)
     conn.row_factory = sqlite3.Row
+    _apply_pragmas(conn)
     return conn
 
 
+# Sort key for grievance listings. The index below is built on this exact
+# expression, so queries must use it verbatim for SQLite to read rows in order
+GRIEVANCE_PRIORITY_RANK_SQL = (
+    "CASE priority WHEN 'urgent' THEN 0 WHEN 'high' THEN 1 ELSE 2 END"
+)
+
+_thread_local = threading.local()
+
+
+def get_thread_connection() -> sqlite3.Connection:
+    """
+    SQLite connection owned by the calling thread, kept open for reuse
+    
+    Saves the open and PRAGMA setup on every tracker call. Callers must not
+    close it, and should group writes with transaction() so a failed write
+    never leaves the shared connection mid-transaction
+    """
+    conn = getattr(_thread_local, 'conn', None)
+    if conn is None:
+        conn = get_db_connection()
+        _thread_local.conn = conn
+    return conn
+
+
+@contextmanager
+def transaction(conn: sqlite3.Connection):
+    """
+    Run a group of statements as one write transaction
+    
+    BEGIN IMMEDIATE takes the write lock up front, so a read-then-write
+    sequence cannot be interleaved with another writer. Commits on
+    success, rolls back on any exception
+    """
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+    except BaseException:
+        conn.rollback()
+        raise
+    conn.commit()
+
+
 def _init_sqlite():
     """Initialize SQLite schema for legacy modules"""
     conn = get_db_connection()
     c = conn.cursor()
     
     c.execute("PRAGMA foreign_keys = ON")
+    # WAL lets readers proceed while a write is in progress (persists in the file)
+    c.execute("PRAGMA journal_mode = WAL")
+    
+    # Documents Table (used when Supabase is not configured)
+    c.execute("""
+    CREATE TABLE IF NOT EXISTS documents (
+        id TEXT PRIMARY KEY,
+        filename TEXT,
+        file_path TEXT,
+        upload_date TEXT,
+        file_type TEXT,
+        file_size INTEGER,
+        ocr_text TEXT,
+        summary_json TEXT,
+        metadata_json TEXT
+    )
+    """)
     
     # Grievance Table
     c.execute("""
@@ -111,6 +200,24 @@ def _init_sqlite():
     )
     """)
     
+    # Indexes for the lookups and filters the trackers run
+    c.execute("CREATE INDEX IF NOT EXISTS idx_workflow_steps_doc ON workflow_steps (doc_id, timestamp)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_workflows_status ON workflows (current_status)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_grievances_status ON grievances (status)")
+    # Partial index: the overdue query only ever looks at open grievances.
+    # ISO-8601 due_date strings sort chronologically, so range scans work as-is
+    c.execute("""
+    CREATE INDEX IF NOT EXISTS idx_grievances_open_due ON grievances (due_date)
+    WHERE status NOT IN ('resolved', 'closed')
+    """)
+    c.execute(f"""
+    CREATE INDEX IF NOT EXISTS idx_grievances_priority_submitted
+    ON grievances ({GRIEVANCE_PRIORITY_RANK_SQL}, submitted_date)
+    """)
+    c.execute("CREATE INDEX IF NOT EXISTS idx_documents_upload ON documents (upload_date)")
+    # Refreshes planner statistics only where they are missing or stale
+    c.execute("PRAGMA optimize")
+    
     conn.commit()
     conn.close()
 
@@ -119,31 +226,70 @@ def _init_sqlite():
 # Document Storage Functions
 # ========================================
 
+# Statement text is kept constant so sqlite3 reuses the prepared statement
+_UPSERT_DOCUMENT_SQL = """
+    INSERT OR REPLACE INTO documents (
+        id, filename, file_path, upload_date, file_type, file_size,
+        ocr_text, summary_json, metadata_json
+    ) VALUES (
+        :id, :filename, :file_path, :upload_date, :file_type, :file_size,
+        :ocr_text, :summary_json, :metadata_json
+    )
+"""
+
+# The listing never decodes summary_json/metadata_json, so it does not fetch them
+_DOCUMENT_LIST_COLUMNS = "id, filename, file_path, upload_date, file_type, file_size, ocr_text"
+
+_document_conn: Optional[sqlite3.Connection] = None
+_document_lock = threading.Lock()
+
+
+def _get_document_conn() -> sqlite3.Connection:
+    """Long-lived SQLite connection for the documents table"""
+    global _document_conn
+    if _document_conn is None:
+        _init_sqlite()
+        _document_conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+        _document_conn.row_factory = sqlite3.Row
+        _apply_pragmas(_document_conn)
+    return _document_conn
+
+
+def _query_sqlite_documents(sql: str, params: tuple = ()) -> List[Dict]:
+    """Run a read query on the documents table, returning plain dict rows"""
+    with _document_lock:
+        rows = _get_document_conn().execute(sql, params).fetchall()
+    return [dict(row) for row in rows]
+
+
 def save_document(doc_id: str, filename: str, file_path: str, ocr_text: str, 
                   file_type: str = None, file_size: int = 0, 
                   summary: Dict = None, metadata: Dict = None):
-    """Save a document to Supabase"""
-    client = get_supabase_client()
-    if not client:
-        print(f"⚠ Supabase not available, document {doc_id} not saved")
-        return False
+    """Save a document to Supabase, or to local SQLite when Supabase is not configured"""
+    data = {
+        "id": doc_id,
+        "filename": filename,
+        "file_path": file_path,
+        "upload_date": datetime.now().isoformat(),
+        "file_type": file_type or Path(filename).suffix.lower(),
+        "file_size": file_size,
+        "ocr_text": ocr_text,
+        "summary_json": dumps_json(summary or {}),
+        "metadata_json": dumps_json(metadata or {})
+    }
     
+    client = get_supabase_client()
     try:
-        data = {
-            "id": doc_id,
-            "filename": filename,
-            "file_path": file_path,
-            "upload_date": datetime.now().isoformat(),
-            "file_type": file_type or Path(filename).suffix.lower(),
-            "file_size": file_size,
-            "ocr_text": ocr_text,
-            "summary_json": json.dumps(summary or {}),
-            "metadata_json": json.dumps(metadata or {})
-        }
-        
-        # Upsert (insert or update)
-        result = client.table("documents").upsert(data).execute()
-        print(f"✓ Document {doc_id} saved to Supabase")
+        if client:
+            # Upsert (insert or update)
+            client.table("documents").upsert(data).execute()
+            print(f"✓ Document {doc_id} saved to Supabase")
+        else:
+            with _document_lock:
+                conn = _get_document_conn()
+                conn.execute(_UPSERT_DOCUMENT_SQL, data)
+                conn.commit()
+            print(f"✓ Document {doc_id} saved to SQLite")
         return True
     except Exception as e:
         print(f"⚠ Failed to save document {doc_id}: {e}")
@@ -151,16 +297,19 @@ def save_document(doc_id: str, filename: str, file_path: str, ocr_text: str,
 
 
 def get_all_documents_from_db() -> List[Dict]:
-    """Get all documents from Supabase"""
+    """Get all documents from Supabase (or local SQLite)"""
     client = get_supabase_client()
-    if not client:
-        return []
     
     try:
-        result = client.table("documents").select("*").order("upload_date", desc=True).execute()
+        if client:
+            rows = client.table("documents").select(_DOCUMENT_LIST_COLUMNS).order("upload_date", desc=True).execute().data
+        else:
+            rows = _query_sqlite_documents(
+                f"SELECT {_DOCUMENT_LIST_COLUMNS} FROM documents ORDER BY upload_date DESC"
+            )
         
         documents = []
-        for row in result.data:
+        for row in rows:
             doc = {
                 'doc_id': row['id'],
                 'filename': row.get('filename', ''),
@@ -181,16 +330,17 @@ def get_all_documents_from_db() -> List[Dict]:
 
 
 def get_document_by_id(doc_id: str) -> Optional[Dict]:
-    """Get a specific document by ID from Supabase"""
+    """Get a specific document by ID from Supabase (or local SQLite)"""
     client = get_supabase_client()
-    if not client:
-        return None
     
     try:
-        result = client.table("documents").select("*").eq("id", doc_id).execute()
+        if client:
+            rows = client.table("documents").select("*").eq("id", doc_id).execute().data
+        else:
+            rows = _query_sqlite_documents("SELECT * FROM documents WHERE id = ?", (doc_id,))
         
-        if result.data and len(result.data) > 0:
-            row = result.data[0]
+        if rows:
+            row = rows[0]
             return {
                 'doc_id': row['id'],
                 'filename': row.get('filename', ''),
@@ -201,8 +351,8 @@ def get_document_by_id(doc_id: str) -> Optional[Dict]:
                 'full_text': row.get('ocr_text', ''),
                 'word_count': len(row.get('ocr_text', '').split()) if row.get('ocr_text') else 0,
                 'title': row.get('filename') or row['id'],
-                'summary': json.loads(row.get('summary_json', '{}')) if row.get('summary_json') else {},
-                'metadata': json.loads(row.get('metadata_json', '{}')) if row.get('metadata_json') else {}
+                'summary': loads_json(row['summary_json']) if row.get('summary_json') else {},
+                'metadata': loads_json(row['metadata_json']) if row.get('metadata_json') else {}
             }
         return None
     except Exception as e:
@@ -211,14 +361,19 @@ def get_document_by_id(doc_id: str) -> Optional[Dict]:
 
 
 def delete_document(doc_id: str) -> bool:
-    """Delete a document from Supabase"""
+    """Delete a document from Supabase (or local SQLite)"""
     client = get_supabase_client()
-    if not client:
-        return False
     
     try:
-        client.table("documents").delete().eq("id", doc_id).execute()
-        print(f"✓ Document {doc_id} deleted from Supabase")
+        if client:
+            client.table("documents").delete().eq("id", doc_id).execute()
+            print(f"✓ Document {doc_id} deleted from Supabase")
+        else:
+            with _document_lock:
+                conn = _get_document_conn()
+                conn.execute("DELETE FROM documents WHERE id = ?", (doc_id,))
+                conn.commit()
+            print(f"✓ Document {doc_id} deleted from SQLite")
         return True
     except Exception as e:
         print(f"⚠ Failed to delete document {doc_id}: {e}")
@@ -231,15 +386,19 @@ def find_similar_documents(new_text: str, threshold: float = 0.7) -> List[Dict]:
     Uses simple word overlap similarity for detection.
     Returns list of similar documents with similarity scores.
     """
-    client = get_supabase_client()
-    if not client or not new_text:
+    if not new_text:
         return []
     
+    client = get_supabase_client()
+    
     try:
         # Get all existing documents
-        result = client.table("documents").select("id, filename, ocr_text").execute()
+        if client:
+            rows = client.table("documents").select("id, filename, ocr_text").execute().data
+        else:
+            rows = _query_sqlite_documents("SELECT id, filename, ocr_text FROM documents")
         
-        if not result.data:
+        if not rows:
             return []
         
         # Extract words from new document (normalized)
@@ -249,7 +408,7 @@ def find_similar_documents(new_text: str, threshold: float = 0.7) -> List[Dict]:
         
         similar_docs = []
         
-        for row in result.data:
+        for row in rows:
             existing_text = row.get('ocr_text', '')
             if not existing_text:
                 continue
@@ -2,8 +2,12 @@
 Action Extraction Module for Government Document AI System
 Extracts: WHO must do WHAT by WHEN with Priority flagging
 """
+import hashlib
 import re
-from typing import Dict, List, Optional
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional
 from dataclasses import dataclass
 from datetime import datetime
 from enum import Enum
@@ -20,6 +24,102 @@ import sys
 from pathlib import Path
 sys.path.append(str(Path(__file__).parent.parent))
 from config import PERPLEXITY_API_KEY, PERPLEXITY_BASE_URL, PERPLEXITY_MODEL
+from modules.regex_engine import compile_pattern
+
+# Patterns used on every document, compiled once at import
+_SENTENCE_SPLIT_RE = re.compile(r'[।.!?]\s*')
+_AI_ITEM_SPLIT_RE = re.compile(r'---+')
+_AI_FIELD_RES = {
+    field: re.compile(rf'{field}:\s*(.+?)(?:\n|$)', re.IGNORECASE)
+    for field in ('WHO', 'WHAT', 'WHEN', 'PRIORITY', 'ORIGINAL')
+}
+_IMMEDIATE_RE = re.compile(r'forthwith|immediately|तुरंत|तत्काल', re.IGNORECASE)
+_RELATIVE_DEADLINE_RE = re.compile(r'within (\d+) (days?|weeks?|months?)', re.IGNORECASE)
+
+# Shapes the deadline patterns capture, tried with strptime before dateutil;
+# numeric dates are day-first as written in Indian government documents
+_ORDINAL_SUFFIX_RE = re.compile(r'(?<=\d)(?:st|nd|rd|th)\b', re.IGNORECASE)
+_DEADLINE_FORMATS = ('%d/%m/%Y', '%d/%m/%y', '%d %B %Y')
+
+# Priority keywords, matched as substrings of the lowercased sentence
+_CRITICAL_KEYWORDS = ('immediately', 'forthwith', 'urgent', 'critical', 'तुरंत', 'अविलंब')
+_HIGH_PRIORITY_KEYWORDS = ('required', 'mandatory', 'must', 'shall')
+
+_ACTION_PHRASE_PATTERNS = [
+    compile_pattern(pattern) for pattern in (
+        r'(?:directed|required|instructed) to (.+?)(?:[।.]|$)',
+        r'(?:shall|must|will) (.+?)(?:[।.]|$)',
+        r'(?:submit|provide|release|complete) (.+?)(?:[।.]|$)',
+    )
+]
+
+_AMOUNT_PATTERNS = [
+    compile_pattern(pattern) for pattern in (
+        r'₹\s*([\d,]+(?:\.\d+)?)\s*(crore|lakh|thousand)?',
+        r'Rs\.?\s*([\d,]+(?:\.\d+)?)\s*(crore|lakh|thousand)?',
+        r'Rupees?\s+([\w\s]+)\s+(crore|lakh|thousand)?',
+        r'([\d,]+(?:\.\d+)?)\s*(crore|lakh|thousand)',
+    )
+]
+
+def _iter_sentences(text: str) -> Iterator[str]:
+    """Yield the pieces between sentence boundaries without building a list"""
+    start = 0
+    for match in _SENTENCE_SPLIT_RE.finditer(text):
+        yield text[start:match.start()]
+        start = match.end()
+    yield text[start:]
+
+
+# Every action pattern contains at least one of these words, so a sentence
+# without any of them can skip the regex check (keep in sync with
+# ActionExtractor.action_patterns)
+_ACTION_TRIGGERS = frozenset({
+    "directed", "required", "instructed", "ordered",
+    "ensure", "submit", "provide", "release", "complete",
+    "action", "requested",
+    "आदेश", "निर्देश", "अपेक्षित",
+})
+
+# Non-nested optional groups, written (?:...)? or (?:...|), at either end
+_LEADING_OPTIONAL_RE = re.compile(r'^(?:\(\?:[^()]*\)\?|\(\?:[^()]*\|\))+')
+_TRAILING_OPTIONAL_RE = re.compile(r'(?:\(\?:[^()]*\)\?|\(\?:[^()]*\|\))+$')
+
+
+def _presence_pattern(patterns: List[str]) -> re.Pattern:
+    """
+    Combine patterns into one alternation that only answers "does any match?"
+    
+    Optional groups at either end of a pattern cannot change whether it
+    matches somewhere, so they are dropped; that gives the engine a
+    literal to scan for instead of trying the optional prefix at every
+    position
+    """
+    cores = []
+    for pattern in patterns:
+        core = _TRAILING_OPTIONAL_RE.sub('', _LEADING_OPTIONAL_RE.sub('', pattern))
+        cores.append(f"(?:{core or pattern})")
+    return compile_pattern("|".join(cores))
+
+
+_REFERENCE_PATTERNS = [
+    compile_pattern(pattern) for pattern in (
+        r'(?:File No\.?|F\.No\.?)\s*[\w/-]+',
+        r'(?:O\.M\.|Office Memorandum)\s*No\.?\s*[\w/-]+',
+        r'(?:Order No\.?|Notification No\.?)\s*[\w/-]+',
+        r'(?:Circular No\.?)\s*[\w/-]+',
+        r'\d{1,2}/\d{1,2}/\d{4}-[\w]+',
+    )
+]
+
+
+# Requests in flight at once when a batch goes to the AI backend
+MAX_CONCURRENT_AI_REQUESTS = 8
+
+# AI responses kept per extractor, keyed on the document text sent
+MAX_CACHED_AI_RESPONSES = 1024
+# Only this much of a document goes into the prompt
+AI_PROMPT_TEXT_LIMIT = 8000
 
 
 class Priority(Enum):
@@ -30,7 +130,7 @@ class Priority(Enum):
     LOW = "low"            # No specific deadline
 
 
-@dataclass
+@dataclass(slots=True)
 class ActionItem:
     """Extracted action item"""
     who: str                    # Responsible party
@@ -42,7 +142,7 @@ class ActionItem:
     confidence: float           # Extraction confidence
 
 
-@dataclass
+@dataclass(slots=True)
 class ExtractionResult:
     """Complete extraction result"""
     actions: List[ActionItem]
@@ -57,11 +157,23 @@ class ActionExtractor:
     Extract action items, deadlines, and responsibilities from government documents
     """
     
-    def __init__(self, api_key: Optional[str] = None):
-        """Initialize extractor"""
+    def __init__(self, api_key: Optional[str] = None, max_actions: Optional[int] = None):
+        """
+        Initialize extractor
+        
+        Args:
+            api_key: Perplexity API key (defaults to config)
+            max_actions: Stop rule-based extraction after this many actions (None = no limit)
+        """
         self.api_key = api_key or PERPLEXITY_API_KEY
+        self.max_actions = max_actions
         self.client = None
         
+        # Raw AI responses by text digest; parsed again on every hit so
+        # relative deadlines are computed from the current time
+        self._ai_cache: "OrderedDict[bytes, str]" = OrderedDict()
+        self._ai_cache_lock = threading.Lock()
+        
         if PERPLEXITY_AVAILABLE and self.api_key:
             self.client = OpenAI(api_key=self.api_key, base_url=PERPLEXITY_BASE_URL)
             print("✓ Action Extractor with Perplexity")
@@ -73,13 +185,16 @@ class ActionExtractor:
             r'Ministry of [\w\s]+',
             r'Department of [\w\s]+',
             r'Directorate [\w\s]+',
-            r'(?:Joint |Additional |Under |Deputy )?Secretary',
-            r'(?:Joint |Additional )?Director',
+            # Titles spelled out in full (rather than an optional prefix) so
+            # the engine can skip ahead to a likely first letter
+            r'(?:Joint Secretary|Additional Secretary|Under Secretary|Deputy Secretary|Secretary)',
+            r'(?:Joint Director|Additional Director|Director)',
             r'Commissioner',
             r'Controller',
             r'Head of (?:Department|Office)',
             r'मंत्रालय', r'विभाग', r'निदेशालय', r'सचिव', r'निदेशक'
         ]
+        self.entity_patterns = [compile_pattern(p) for p in self.entity_patterns]
         
         # Action verb patterns
         self.action_patterns = [
@@ -89,6 +204,8 @@ class ActionExtractor:
             r'(?:is |)requested to',
             r'आदेश(?:ित|)', r'निर्देश(?:ित|)', r'अपेक्षित'
         ]
+        self._action_union = _presence_pattern(self.action_patterns)
+        self.action_patterns = [compile_pattern(p) for p in self.action_patterns]
         
         # Deadline patterns
         self.deadline_patterns = [
@@ -98,6 +215,7 @@ class ActionExtractor:
             r'(\d{1,2}[-/]\d{1,2}[-/]\d{2,4}) (?:तक|से पहले)',
             r'forthwith|immediately|तुरंत|तत्काल'
         ]
+        self.deadline_patterns = [compile_pattern(p) for p in self.deadline_patterns]
     
     def extract(self, text: str) -> ExtractionResult:
         """
@@ -109,13 +227,16 @@ class ActionExtractor:
         Returns:
             ExtractionResult with actions, deadlines, etc.
         """
+        # One reference time so every relative deadline and priority agrees
+        now = datetime.now()
+        
         if self.client:
-            actions = self._extract_with_perplexity(text)
+            actions = self._extract_with_perplexity(text, now)
         else:
-            actions = self._extract_rule_based(text)
+            actions = self._extract_rule_based(text, now)
         
         # Extract additional metadata
-        deadlines = self._extract_all_deadlines(text)
+        deadlines = self._extract_all_deadlines(text, now)
         parties = self._extract_responsible_parties(text)
         amounts = self._extract_financial_amounts(text)
         references = self._extract_references(text)
@@ -128,8 +249,36 @@ class ActionExtractor:
             references=references
         )
     
-    def _extract_with_perplexity(self, text: str) -> List[ActionItem]:
-        """Use Perplexity for intelligent action extraction"""
+    def extract_many(self, texts: List[str]) -> List[ExtractionResult]:
+        """
+        Extract action items from several documents
+        
+        With the AI backend each document is a blocking network call, so
+        up to MAX_CONCURRENT_AI_REQUESTS run at once; rule-based extraction
+        is CPU-bound and runs sequentially
+        
+        Args:
+            texts: Document texts
+            
+        Returns:
+            One ExtractionResult per text, in input order
+        """
+        if not self.client or len(texts) < 2:
+            return [self.extract(text) for text in texts]
+        
+        with ThreadPoolExecutor(max_workers=min(MAX_CONCURRENT_AI_REQUESTS, len(texts))) as pool:
+            return list(pool.map(self.extract, texts))
+    
+    def _extract_with_perplexity(self, text: str, now: Optional[datetime] = None) -> List[ActionItem]:
+        """Use Perplexity for intelligent action extraction; repeated documents reuse the cached response"""
+        prompt_text = text[:AI_PROMPT_TEXT_LIMIT]
+        key = hashlib.blake2b(prompt_text.encode('utf-8'), digest_size=16).digest()
+        with self._ai_cache_lock:
+            content = self._ai_cache.get(key)
+            if content is not None:
+                self._ai_cache.move_to_end(key)
+        if content is not None:
+            return self._parse_ai_response(content, now)
         
         prompt = f"""Extract action items from this government document.
 
@@ -149,7 +298,7 @@ ORIGINAL: [exact quote from document]
 ---
 
 Document:
-{text[:8000]}
+{prompt_text}
 
 Extract all action items:"""
 
@@ -164,18 +313,25 @@ Extract all action items:"""
             )
             
             content = response.choices[0].message.content
-            return self._parse_ai_response(content)
+            actions = self._parse_ai_response(content, now)
+            
+            with self._ai_cache_lock:
+                self._ai_cache[key] = content
+                self._ai_cache.move_to_end(key)
+                while len(self._ai_cache) > MAX_CACHED_AI_RESPONSES:
+                    self._ai_cache.popitem(last=False)
+            return actions
             
         except Exception as e:
             print(f"Perplexity extraction failed: {e}")
-            return self._extract_rule_based(text)
+            return self._extract_rule_based(text, now)
     
-    def _parse_ai_response(self, response: str) -> List[ActionItem]:
+    def _parse_ai_response(self, response: str, now: Optional[datetime] = None) -> List[ActionItem]:
         """Parse AI response into ActionItem objects"""
         actions = []
         
         # Split by action item separator
-        items = re.split(r'---+', response)
+        items = _AI_ITEM_SPLIT_RE.split(response)
         
         for item in items:
             if not item.strip():
@@ -189,7 +345,7 @@ Extract all action items:"""
             
             if who and what:
                 # Parse deadline
-                deadline_date = self._parse_deadline(when) if when else None
+                deadline_date = self._parse_deadline(when, now) if when else None
                 
                 # Parse priority
                 try:
@@ -211,24 +367,26 @@ Extract all action items:"""
     
     def _extract_field(self, text: str, field: str) -> Optional[str]:
         """Extract a field from AI response"""
-        pattern = rf'{field}:\s*(.+?)(?:\n|$)'
-        match = re.search(pattern, text, re.IGNORECASE)
+        match = _AI_FIELD_RES[field].search(text)
         return match.group(1).strip() if match else None
     
-    def _extract_rule_based(self, text: str) -> List[ActionItem]:
+    def _extract_rule_based(self, text: str, now: Optional[datetime] = None) -> List[ActionItem]:
         """Rule-based action extraction fallback"""
         actions = []
+        now = now or datetime.now()
         
-        # Split into sentences
-        sentences = re.split(r'[।.!?]\s*', text)
-        
-        for sentence in sentences:
+        # Sentences are produced lazily so a capped run stops scanning early
+        for sentence in _iter_sentences(text):
             if not sentence.strip():
                 continue
             
-            # Check if sentence contains action indicators
-            has_action = any(re.search(pattern, sentence, re.IGNORECASE) 
-                           for pattern in self.action_patterns)
+            # Check if sentence contains action indicators; the substring test
+            # rules out most sentences before any regex runs
+            sentence_lower = sentence.lower()
+            has_action = (
+                any(trigger in sentence_lower for trigger in _ACTION_TRIGGERS)
+                and self._action_union.search(sentence) is not None
+            )
             
             if has_action:
                 # Extract WHO
@@ -238,10 +396,10 @@ Extract all action items:"""
                 what = self._extract_action_phrase(sentence)
                 
                 # Extract WHEN
-                when, deadline_date = self._extract_deadline_from_sentence(sentence)
+                when, deadline_date = self._extract_deadline_from_sentence(sentence, now)
                 
                 # Determine priority
-                priority = self._determine_priority(sentence, deadline_date)
+                priority = self._determine_priority(sentence, deadline_date, now, sentence_lower)
                 
                 if what:
                     actions.append(ActionItem(
@@ -253,13 +411,15 @@ Extract all action items:"""
                         original_text=sentence.strip(),
                         confidence=0.7
                     ))
+                    if self.max_actions is not None and len(actions) >= self.max_actions:
+                        break
         
         return actions
     
     def _extract_entity(self, text: str) -> Optional[str]:
         """Extract responsible entity from text"""
         for pattern in self.entity_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
+            match = pattern.search(text)
             if match:
                 return match.group(0)
         return None
@@ -267,53 +427,56 @@ Extract all action items:"""
     def _extract_action_phrase(self, text: str) -> Optional[str]:
         """Extract the main action phrase"""
         # Look for verb + object patterns
-        patterns = [
-            r'(?:directed|required|instructed) to (.+?)(?:[।.]|$)',
-            r'(?:shall|must|will) (.+?)(?:[।.]|$)',
-            r'(?:submit|provide|release|complete) (.+?)(?:[।.]|$)',
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
+        for pattern in _ACTION_PHRASE_PATTERNS:
+            match = pattern.search(text)
             if match:
                 return match.group(1).strip()[:200]
         
         return text[:200] if len(text) > 10 else None
     
-    def _extract_deadline_from_sentence(self, text: str) -> tuple:
+    def _extract_deadline_from_sentence(self, text: str, now: Optional[datetime] = None) -> tuple:
         """Extract deadline from sentence"""
         for pattern in self.deadline_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
+            match = pattern.search(text)
             if match:
                 deadline_str = match.group(1) if match.lastindex else match.group(0)
-                deadline_date = self._parse_deadline(deadline_str)
+                deadline_date = self._parse_deadline(deadline_str, now)
                 return (deadline_str, deadline_date)
         
         # Check for immediate action keywords
-        if re.search(r'forthwith|immediately|तुरंत|तत्काल', text, re.IGNORECASE):
-            return ("Immediately", datetime.now())
+        if _IMMEDIATE_RE.search(text):
+            return ("Immediately", now or datetime.now())
         
         return (None, None)
     
-    def _parse_deadline(self, deadline_str: str) -> Optional[datetime]:
-        """Parse deadline string to datetime"""
+    def _parse_deadline(self, deadline_str: str, now: Optional[datetime] = None) -> Optional[datetime]:
+        """Parse deadline string to datetime; relative deadlines count from `now`"""
         if not deadline_str:
             return None
         
         try:
             # Handle relative deadlines
-            match = re.match(r'within (\d+) (days?|weeks?|months?)', deadline_str, re.IGNORECASE)
+            match = _RELATIVE_DEADLINE_RE.match(deadline_str)
             if match:
                 num = int(match.group(1))
                 unit = match.group(2).lower()
                 
                 from datetime import timedelta
+                now = now or datetime.now()
                 if 'day' in unit:
-                    return datetime.now() + timedelta(days=num)
+                    return now + timedelta(days=num)
                 elif 'week' in unit:
-                    return datetime.now() + timedelta(weeks=num)
+                    return now + timedelta(weeks=num)
                 elif 'month' in unit:
-                    return datetime.now() + timedelta(days=num*30)
+                    return now + timedelta(days=num*30)
+            
+            # Known shapes first; dateutil's fuzzy parse is far slower
+            normalized = _ORDINAL_SUFFIX_RE.sub('', deadline_str).replace('-', '/').replace(',', '')
+            for fmt in _DEADLINE_FORMATS:
+                try:
+                    return datetime.strptime(normalized, fmt)
+                except ValueError:
+                    pass
             
             # Try parsing as date
             return date_parser.parse(deadline_str, fuzzy=True)
@@ -321,17 +484,20 @@ Extract all action items:"""
         except:
             return None
     
-    def _determine_priority(self, text: str, deadline: Optional[datetime]) -> Priority:
-        """Determine action priority"""
-        text_lower = text.lower()
+    def _determine_priority(self, text: str, deadline: Optional[datetime],
+                            now: Optional[datetime] = None,
+                            text_lower: Optional[str] = None) -> Priority:
+        """Determine action priority; pass `text_lower` if the caller already has it"""
+        if text_lower is None:
+            text_lower = text.lower()
         
         # Critical keywords
-        if any(word in text_lower for word in ['immediately', 'forthwith', 'urgent', 'critical', 'तुरंत', 'अविलंब']):
+        if any(word in text_lower for word in _CRITICAL_KEYWORDS):
             return Priority.CRITICAL
         
         # Check deadline proximity
         if deadline:
-            days_until = (deadline - datetime.now()).days
+            days_until = (deadline - (now or datetime.now())).days
             if days_until <= 3:
                 return Priority.CRITICAL
             elif days_until <= 7:
@@ -340,19 +506,23 @@ Extract all action items:"""
                 return Priority.MEDIUM
         
         # High priority keywords
-        if any(word in text_lower for word in ['required', 'mandatory', 'must', 'shall']):
+        if any(word in text_lower for word in _HIGH_PRIORITY_KEYWORDS):
             return Priority.HIGH
         
         return Priority.MEDIUM
     
-    def _extract_all_deadlines(self, text: str) -> List[Dict]:
+    def _extract_all_deadlines(self, text: str, now: Optional[datetime] = None) -> List[Dict]:
         """Extract all deadlines from text"""
         deadlines = []
+        # Long documents repeat the same dates; parse each distinct one once
+        parsed_cache = {}
         
         for pattern in self.deadline_patterns:
-            for match in re.finditer(pattern, text, re.IGNORECASE):
+            for match in pattern.finditer(text):
                 deadline_str = match.group(1) if match.lastindex else match.group(0)
-                parsed = self._parse_deadline(deadline_str)
+                if deadline_str not in parsed_cache:
+                    parsed_cache[deadline_str] = self._parse_deadline(deadline_str, now)
+                parsed = parsed_cache[deadline_str]
                 
                 # Get context (surrounding text)
                 start = max(0, match.start() - 50)
@@ -372,7 +542,7 @@ Extract all action items:"""
         parties = set()
         
         for pattern in self.entity_patterns:
-            for match in re.finditer(pattern, text, re.IGNORECASE):
+            for match in pattern.finditer(text):
                 parties.add(match.group(0))
         
         return list(parties)
@@ -381,15 +551,8 @@ Extract all action items:"""
         """Extract financial amounts from text"""
         amounts = []
         
-        patterns = [
-            r'₹\s*([\d,]+(?:\.\d+)?)\s*(crore|lakh|thousand)?',
-            r'Rs\.?\s*([\d,]+(?:\.\d+)?)\s*(crore|lakh|thousand)?',
-            r'Rupees?\s+([\w\s]+)\s+(crore|lakh|thousand)?',
-            r'([\d,]+(?:\.\d+)?)\s*(crore|lakh|thousand)',
-        ]
-        
-        for pattern in patterns:
-            for match in re.finditer(pattern, text, re.IGNORECASE):
+        for pattern in _AMOUNT_PATTERNS:
+            for match in pattern.finditer(text):
                 amount = match.group(1).replace(',', '')
                 unit = match.group(2) if match.lastindex >= 2 else None
                 
@@ -411,16 +574,8 @@ Extract all action items:"""
         """Extract document references (file numbers, order numbers)"""
         references = []
         
-        patterns = [
-            r'(?:File No\.?|F\.No\.?)\s*[\w/-]+',
-            r'(?:O\.M\.|Office Memorandum)\s*No\.?\s*[\w/-]+',
-            r'(?:Order No\.?|Notification No\.?)\s*[\w/-]+',
-            r'(?:Circular No\.?)\s*[\w/-]+',
-            r'\d{1,2}/\d{1,2}/\d{4}-[\w]+',
-        ]
-        
-        for pattern in patterns:
-            for match in re.finditer(pattern, text, re.IGNORECASE):
+        for pattern in _REFERENCE_PATTERNS:
+            for match in pattern.finditer(text):
                 references.append(match.group(0))
         
         return list(set(references))
@@ -2,9 +2,10 @@
 Grievance Tracking Module for eFile Sathi
 Track and manage citizen grievances from documents
 """
+import re
 import uuid
 from datetime import datetime, timedelta
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 from dataclasses import dataclass, field
 from enum import Enum
 
@@ -50,9 +51,31 @@ class GrievanceTracker:
     Compatible with CPGRAMS (Centralized Public Grievance Redress and Monitoring System)
     """
     
-import json
 import sqlite3
-from modules.database import get_db_connection, init_db
+from modules.database import (
+    get_thread_connection, init_db, transaction, dumps_json, loads_json,
+    GRIEVANCE_PRIORITY_RANK_SQL,
+)
+
+# UPDATE ... RETURNING needs SQLite 3.35+
+_SQLITE_HAS_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
+
+# Value -> member maps for decoding rows; a dict lookup skips Enum.__call__
+_PRIORITY_BY_VALUE = {member.value: member for member in GrievancePriority}
+_STATUS_BY_VALUE = {member.value: member for member in GrievanceStatus}
+
+# Phrases that mark a grievance in document text, with the priority to file it under
+_GRIEVANCE_PATTERNS = [
+    (re.compile(pattern, re.IGNORECASE), priority)
+    for pattern, priority in [
+        (r'complaint[s]?\s+(?:regarding|about|for)\s+(.+?)(?:\.|$)', 'normal'),
+        (r'grievance[s]?\s+(?:regarding|about)\s+(.+?)(?:\.|$)', 'normal'),
+        (r'urgent\s+(?:attention|action)\s+(?:required|needed)\s+(?:for|on)\s+(.+?)(?:\.|$)', 'urgent'),
+        (r'शिकायत\s+(.+?)(?:।|$)', 'normal'),
+        (r'तत्काल\s+(.+?)(?:।|$)', 'urgent'),
+    ]
+]
+
 
 class GrievanceTracker:
     """
@@ -73,76 +96,92 @@ class GrievanceTracker:
     
     def _add_sample_data(self):
         """Add sample grievances if DB is empty"""
-        conn = get_db_connection()
+        conn = get_thread_connection()
         cursor = conn.cursor()
         
-        cursor.execute("SELECT count(*) FROM grievances")
-        count = cursor.fetchone()[0]
-        
-        if count == 0:
-            print("Initialization: Adding sample grievances...")
-            samples = [
-                {
-                    'subject': 'Delay in pension disbursement',
-                    'details': 'Pension not received for 3 months',
-                    'priority': GrievancePriority.URGENT.value,
-                    'status': GrievanceStatus.PENDING.value,
-                    'days_ago': 3,
-                    'department': 'Department of Pension'
-                },
-                {
-                    'subject': 'Request for ration card correction',
-                    'details': 'Name spelling error in ration card',
-                    'priority': GrievancePriority.HIGH.value,
-                    'status': GrievanceStatus.PROCESSING.value,
-                    'days_ago': 6,
-                    'department': 'Food & Civil Supplies'
-                },
-                {
-                    'subject': 'Property tax assessment query',
-                    'details': 'Dispute regarding property valuation',
-                    'priority': GrievancePriority.NORMAL.value,
-                    'status': GrievanceStatus.RESOLVED.value,
-                    'days_ago': 11,
-                    'resolved_days_ago': 5,
-                    'department': 'Municipal Corporation'
-                }
-            ]
+        with transaction(conn):
+            cursor.execute("SELECT count(*) FROM grievances")
+            count = cursor.fetchone()[0]
             
-            for i, sample in enumerate(samples):
-                submitted = datetime.now() - timedelta(days=sample['days_ago'])
-                due = submitted + timedelta(days=15)
-                grv_id = f"GRV-{datetime.now().year}-{1000+i+1:04d}"
+            if count == 0:
+                print("Initialization: Adding sample grievances...")
+                samples = [
+                    {
+                        'subject': 'Delay in pension disbursement',
+                        'details': 'Pension not received for 3 months',
+                        'priority': GrievancePriority.URGENT.value,
+                        'status': GrievanceStatus.PENDING.value,
+                        'days_ago': 3,
+                        'department': 'Department of Pension'
+                    },
+                    {
+                        'subject': 'Request for ration card correction',
+                        'details': 'Name spelling error in ration card',
+                        'priority': GrievancePriority.HIGH.value,
+                        'status': GrievanceStatus.PROCESSING.value,
+                        'days_ago': 6,
+                        'department': 'Food & Civil Supplies'
+                    },
+                    {
+                        'subject': 'Property tax assessment query',
+                        'details': 'Dispute regarding property valuation',
+                        'priority': GrievancePriority.NORMAL.value,
+                        'status': GrievanceStatus.RESOLVED.value,
+                        'days_ago': 11,
+                        'resolved_days_ago': 5,
+                        'department': 'Municipal Corporation'
+                    }
+                ]
                 
-                resolved_date = None
-                if sample['status'] == 'resolved':
-                    resolved_date = (datetime.now() - timedelta(days=sample.get('resolved_days_ago', 1))).isoformat()
+                rows = []
+                for i, sample in enumerate(samples):
+                    submitted = datetime.now() - timedelta(days=sample['days_ago'])
+                    due = submitted + timedelta(days=15)
+                    grv_id = f"GRV-{datetime.now().year}-{1000+i+1:04d}"
+                    
+                    resolved_date = None
+                    if sample['status'] == 'resolved':
+                        resolved_date = (datetime.now() - timedelta(days=sample.get('resolved_days_ago', 1))).isoformat()
+                    
+                    rows.append((
+                        grv_id, sample['subject'], sample['details'], sample['priority'], sample['status'],
+                        submitted.isoformat(), due.isoformat(), resolved_date, sample['department'],
+                        dumps_json([])
+                    ))
                 
-                cursor.execute("""
+                cursor.executemany("""
                     INSERT INTO grievances (
                         id, subject, details, priority, status, 
                         submitted_date, due_date, resolved_date, department, updates_json
                     ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    grv_id, sample['subject'], sample['details'], sample['priority'], sample['status'],
-                    submitted.isoformat(), due.isoformat(), resolved_date, sample['department'],
-                    json.dumps([])
-                ))
-            
-            conn.commit()
-        conn.close()
+                """, rows)
 
-    def _generate_id(self) -> str:
-        """Generate unique grievance ID"""
-        conn = get_db_connection()
+    def _generate_id(self, conn: sqlite3.Connection) -> str:
+        """
+        Generate unique grievance ID
+        
+        The ID follows the row count, so call this inside the write
+        transaction that inserts the grievance
+        """
         cursor = conn.cursor()
         cursor.execute("SELECT count(*) FROM grievances")
         count = cursor.fetchone()[0]
-        conn.close()
         
         year = datetime.now().year
         return f"GRV-{year}-{count + 1001:04d}"
     
+    @staticmethod
+    def _due_date(priority: str, submitted: datetime) -> datetime:
+        """Resolution deadline for a new grievance of the given priority"""
+        priority_enum = GrievancePriority(priority)
+        if priority_enum == GrievancePriority.URGENT:
+            due_days = 7
+        elif priority_enum == GrievancePriority.HIGH:
+            due_days = 10
+        else:
+            due_days = 15
+        return submitted + timedelta(days=due_days)
+    
     def register_grievance(
         self,
         subject: str,
@@ -153,125 +192,199 @@ class GrievanceTracker:
         source_doc_id: str = ""
     ) -> Grievance:
         """Register a new grievance"""
-        grv_id = self._generate_id()
         now = datetime.now()
         
-        # Calculate due date
-        priority_enum = GrievancePriority(priority)
-        if priority == "urgent":
-            due_days = 7
-        elif priority == "high":
-            due_days = 10
-        else:
-            due_days = 15
+        due_date = self._due_date(priority, now)
         
-        due_date = now + timedelta(days=due_days)
+        conn = get_thread_connection()
+        with transaction(conn):
+            grv_id = self._generate_id(conn)
+            conn.execute("""
+                INSERT INTO grievances (
+                    id, subject, details, priority, status, 
+                    submitted_date, due_date, citizen_name, department, source_doc_id, updates_json
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (
+                grv_id, subject, details, priority, GrievanceStatus.PENDING.value,
+                now.isoformat(), due_date.isoformat(), citizen_name, department, source_doc_id,
+                dumps_json([])
+            ))
         
-        conn = get_db_connection()
-        conn.execute("""
-            INSERT INTO grievances (
-                id, subject, details, priority, status, 
-                submitted_date, due_date, citizen_name, department, source_doc_id, updates_json
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
-            grv_id, subject, details, priority, GrievanceStatus.PENDING.value,
-            now.isoformat(), due_date.isoformat(), citizen_name, department, source_doc_id,
-            json.dumps([])
-        ))
-        conn.commit()
-        conn.close()
+        # Everything stored is known here, so skip reading the row back
+        return Grievance(
+            id=grv_id,
+            subject=subject,
+            details=details,
+            priority=GrievancePriority(priority),
+            status=GrievanceStatus.PENDING,
+            submitted_date=now,
+            due_date=due_date,
+            department=department,
+            citizen_name=citizen_name,
+            source_doc_id=source_doc_id
+        )
+    
+    def _register_many(self, entries: List[Tuple[str, str, str]], source_doc_id: str = "") -> List[Grievance]:
+        """
+        Register several grievances with one insert and one commit
         
-        return self.get_grievance(grv_id)
+        Args:
+            entries: (subject, details, priority) for each grievance
+            source_doc_id: Document the grievances were extracted from
+            
+        Returns:
+            The registered grievances, in input order
+        """
+        if not entries:
+            return []
+        
+        now = datetime.now()
+        grievances = []
+        conn = get_thread_connection()
+        with transaction(conn):
+            # IDs follow the row count, read under the write lock
+            count = conn.execute("SELECT count(*) FROM grievances").fetchone()[0]
+            for i, (subject, details, priority) in enumerate(entries):
+                grievances.append(Grievance(
+                    id=f"GRV-{now.year}-{count + 1001 + i:04d}",
+                    subject=subject,
+                    details=details,
+                    priority=GrievancePriority(priority),
+                    status=GrievanceStatus.PENDING,
+                    submitted_date=now,
+                    due_date=self._due_date(priority, now),
+                    source_doc_id=source_doc_id
+                ))
+            
+            conn.executemany("""
+                INSERT INTO grievances (
+                    id, subject, details, priority, status,
+                    submitted_date, due_date, citizen_name, department, source_doc_id, updates_json
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, [
+                (g.id, g.subject, g.details, g.priority.value, g.status.value,
+                 g.submitted_date.isoformat(), g.due_date.isoformat(), "", "", source_doc_id, dumps_json([]))
+                for g in grievances
+            ])
+        
+        return grievances
     
     def update_status(self, grv_id: str, new_status: str, note: str = "") -> Optional[Grievance]:
         """Update grievance status"""
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("SELECT updates_json FROM grievances WHERE id = ?", (grv_id,))
-        row = cursor.fetchone()
-        if not row:
-            conn.close()
-            return None
+        if not _SQLITE_HAS_RETURNING:
+            return self._update_status_read_modify_write(grv_id, new_status, note)
         
-        updates = json.loads(row['updates_json']) if row['updates_json'] else []
+        now_iso = datetime.now().isoformat()
+        update = dumps_json({'timestamp': now_iso, 'status': new_status, 'note': note}) if note else None
         
-        resolved_date = None
-        if new_status == "resolved":
-            resolved_date = datetime.now().isoformat()
+        # One statement: the note is appended to updates_json inside SQLite and
+        # the updated row comes straight back
+        conn = get_thread_connection()
+        with transaction(conn):
+            rows = conn.execute("""
+                UPDATE grievances SET
+                    status = ?,
+                    updates_json = CASE WHEN ? IS NULL
+                        THEN COALESCE(NULLIF(updates_json, ''), '[]')
+                        ELSE json_insert(COALESCE(NULLIF(updates_json, ''), '[]'), '$[#]', json(?))
+                    END,
+                    resolved_date = CASE WHEN ? = 'resolved' THEN ? ELSE resolved_date END
+                WHERE id = ?
+                RETURNING *
+            """, (new_status, update, update, new_status, now_iso, grv_id)).fetchall()
         
-        if note:
-            updates.append({
-                'timestamp': datetime.now().isoformat(),
-                'status': new_status,
-                'note': note
-            })
-        
-        query = "UPDATE grievances SET status = ?, updates_json = ?"
-        params = [new_status, json.dumps(updates)]
+        return self._row_to_grievance(rows[0]) if rows else None
+    
+    def _update_status_read_modify_write(self, grv_id: str, new_status: str, note: str = "") -> Optional[Grievance]:
+        """update_status for SQLite builds without RETURNING"""
+        conn = get_thread_connection()
+        cursor = conn.cursor()
         
-        if resolved_date:
-            query += ", resolved_date = ?"
-            params.append(resolved_date)
+        # Read-modify-write of updates_json, so hold the write lock throughout
+        with transaction(conn):
+            cursor.execute("SELECT updates_json FROM grievances WHERE id = ?", (grv_id,))
+            row = cursor.fetchone()
             
-        query += " WHERE id = ?"
-        params.append(grv_id)
-        
-        cursor.execute(query, params)
-        conn.commit()
-        conn.close()
+            if row:
+                updates = loads_json(row['updates_json']) if row['updates_json'] else []
+                
+                resolved_date = None
+                if new_status == "resolved":
+                    resolved_date = datetime.now().isoformat()
+                
+                if note:
+                    updates.append({
+                        'timestamp': datetime.now().isoformat(),
+                        'status': new_status,
+                        'note': note
+                    })
+                
+                query = "UPDATE grievances SET status = ?, updates_json = ?"
+                params = [new_status, dumps_json(updates)]
+                
+                if resolved_date:
+                    query += ", resolved_date = ?"
+                    params.append(resolved_date)
+                    
+                query += " WHERE id = ?"
+                params.append(grv_id)
+                
+                cursor.execute(query, params)
         
+        if not row:
+            return None
         return self.get_grievance(grv_id)
     
     def get_grievance(self, grv_id: str) -> Optional[Grievance]:
         """Get grievance by ID"""
-        conn = get_db_connection()
+        conn = get_thread_connection()
         cursor = conn.cursor()
         cursor.execute("SELECT * FROM grievances WHERE id = ?", (grv_id,))
         row = cursor.fetchone()
-        conn.close()
         
         if not row:
             return None
             
         return self._row_to_grievance(row)
     
-    def get_all_grievances(self, status_filter: Optional[str] = None) -> List[Grievance]:
-        """Get all grievances"""
-        conn = get_db_connection()
+    def get_all_grievances(self, status_filter: Optional[str] = None,
+                           limit: Optional[int] = None, offset: int = 0) -> List[Grievance]:
+        """
+        Get grievances, most urgent first, oldest first within a priority
+        
+        Args:
+            status_filter: Only return grievances with this status
+            limit: Maximum number of grievances to return (all if None)
+            offset: Number of grievances to skip
+            
+        Returns:
+            List of Grievance objects
+        """
+        conn = get_thread_connection()
         query = "SELECT * FROM grievances"
         params = []
         
         if status_filter:
             query += " WHERE status = ?"
             params.append(status_filter)
-            
-        cursor = conn.execute(query, params)
-        rows = cursor.fetchall()
-        conn.close()
         
-        grievances = [self._row_to_grievance(row) for row in rows]
+        query += f" ORDER BY {GRIEVANCE_PRIORITY_RANK_SQL}, submitted_date"
+        if limit is not None or offset:
+            # LIMIT -1 means no limit in SQLite
+            query += " LIMIT ? OFFSET ?"
+            params.extend([-1 if limit is None else limit, offset])
         
-        # Sort in python for complex priority logic or in SQL?
-        # SQL sorting: ORDER BY CASE priority WHEN 'urgent' THEN 1 ...
-        # For simplicity, stick to Python sort to match previous logic exactly
-        priority_order = {'urgent': 0, 'high': 1, 'normal': 2}
-        grievances.sort(
-            key=lambda g: (priority_order.get(g.priority.value, 2), g.submitted_date),
-            reverse=False
-        )
-        return grievances
+        return [self._row_to_grievance(row) for row in conn.execute(query, params)]
     
     def get_overdue_grievances(self) -> List[Grievance]:
         """Get overdue grievances"""
-        conn = get_db_connection()
+        conn = get_thread_connection()
         now_str = datetime.now().isoformat()
         cursor = conn.execute("""
             SELECT * FROM grievances 
             WHERE due_date < ? AND status NOT IN ('resolved', 'closed')
         """, (now_str,))
         rows = cursor.fetchall()
-        conn.close()
         return [self._row_to_grievance(row) for row in rows]
 
     def _row_to_grievance(self, row) -> Grievance:
@@ -280,69 +393,47 @@ class GrievanceTracker:
             id=row['id'],
             subject=row['subject'],
             details=row['details'],
-            priority=GrievancePriority(row['priority']),
-            status=GrievanceStatus(row['status']),
+            priority=_PRIORITY_BY_VALUE[row['priority']],
+            status=_STATUS_BY_VALUE[row['status']],
             submitted_date=datetime.fromisoformat(row['submitted_date']),
             due_date=datetime.fromisoformat(row['due_date']),
             resolved_date=datetime.fromisoformat(row['resolved_date']) if row['resolved_date'] else None,
             department=row['department'] or "",
             citizen_name=row['citizen_name'] or "",
             source_doc_id=row['source_doc_id'] or "",
-            updates=json.loads(row['updates_json']) if row['updates_json'] else []
+            updates=loads_json(row['updates_json']) if row['updates_json'] else []
         )
     
     def get_stats(self) -> Dict:
         """Get statistics directly from DB"""
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        stats = {}
-        cursor.execute("SELECT count(*) FROM grievances")
-        stats['total'] = cursor.fetchone()[0]
-        
-        cursor.execute("SELECT count(*) FROM grievances WHERE status='pending'")
-        stats['pending'] = cursor.fetchone()[0]
-        
-        cursor.execute("SELECT count(*) FROM grievances WHERE status='processing'")
-        stats['processing'] = cursor.fetchone()[0]
-        
-        cursor.execute("SELECT count(*) FROM grievances WHERE status='resolved'")
-        stats['resolved'] = cursor.fetchone()[0]
-        
-        cursor.execute("SELECT count(*) FROM grievances WHERE priority='urgent'")
-        stats['urgent'] = cursor.fetchone()[0]
+        conn = get_thread_connection()
         
+        # One pass over the table; COALESCE keeps the counts at 0 when it is empty
         now_str = datetime.now().isoformat()
-        cursor.execute("SELECT count(*) FROM grievances WHERE due_date < ? AND status NOT IN ('resolved', 'closed')", (now_str,))
-        stats['overdue'] = cursor.fetchone()[0]
+        row = conn.execute("""
+            SELECT
+                count(*) AS total,
+                COALESCE(SUM(status = 'pending'), 0) AS pending,
+                COALESCE(SUM(status = 'processing'), 0) AS processing,
+                COALESCE(SUM(status = 'resolved'), 0) AS resolved,
+                COALESCE(SUM(priority = 'urgent'), 0) AS urgent,
+                COALESCE(SUM(due_date < ? AND status NOT IN ('resolved', 'closed')), 0) AS overdue
+            FROM grievances
+        """, (now_str,)).fetchone()
+        stats = dict(row)
         
-        conn.close()
         return stats
     
     def extract_grievances_from_document(self, text: str, doc_id: str = "") -> List[Grievance]:
         """delegate to original logic but persist to DB via register_grievance"""
-        import re
-        extracted = []
-        grievance_patterns = [
-            (r'complaint[s]?\s+(?:regarding|about|for)\s+(.+?)(?:\.|$)', 'normal'),
-            (r'grievance[s]?\s+(?:regarding|about)\s+(.+?)(?:\.|$)', 'normal'),
-            (r'urgent\s+(?:attention|action)\s+(?:required|needed)\s+(?:for|on)\s+(.+?)(?:\.|$)', 'urgent'),
-            (r'शिकायत\s+(.+?)(?:।|$)', 'normal'),
-            (r'तत्काल\s+(.+?)(?:।|$)', 'urgent')
-        ]
-        
-        for pattern, priority in grievance_patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE)
-            for match in matches[:3]:
+        entries = []
+        for pattern, priority in _GRIEVANCE_PATTERNS:
+            for match in pattern.findall(text)[:3]:
                 if len(match) > 10:
-                    grievance = self.register_grievance(
-                        subject=match[:100],
-                        details=f"Extracted from document: {match}",
-                        priority=priority,
-                        source_doc_id=doc_id
-                    )
-                    extracted.append(grievance)
-        return extracted
+                    entries.append((match[:100], f"Extracted from document: {match}", priority))
+        
+        # Persist every match in one transaction rather than one commit each
+        return self._register_many(entries, source_doc_id=doc_id)
 
 
 # Singleton instance
@@ -363,9 +454,10 @@ def register_grievance(subject: str, details: str, priority: str = "normal", **k
     }
 
 
-def get_grievances(status: Optional[str] = None) -> List[dict]:
+def get_grievances(status: Optional[str] = None, limit: Optional[int] = None,
+                   offset: int = 0) -> List[dict]:
     """Get all grievances"""
-    grievances = grievance_tracker.get_all_grievances(status)
+    grievances = grievance_tracker.get_all_grievances(status, limit, offset)
     return [
         {
             'id': g.id,
@@ -402,12 +494,11 @@ if __name__ == "__main__":
     print(f"Registered: {result['id']}")
     
     # Get all grievances
-    all_grv = get_grievances()
-    print(f"\nTotal grievances: {len(all_grv)}")
+    stats = get_grievance_stats()
+    print(f"\nTotal grievances: {stats['total']}")
     
-    for g in all_grv[:3]:
+    for g in get_grievances(limit=3):
         print(f"  {g['id']}: {g['subject']} [{g['status']}]")
     
-    stats = get_grievance_stats()
     print(f"\nStats: {stats}")
 
@@ -4,9 +4,13 @@ Generates PDF reports from extracted text; RTI letters and document exports
 """
 import io
 from datetime import datetime
+from typing import Iterator
 from fpdf import FPDF
 from pathlib import Path
 
+# Size of each chunk yielded when streaming a PDF to the client
+PDF_STREAM_CHUNK_SIZE = 64 * 1024
+
 
 class PDFGenerator(FPDF):
     """Custom PDF class with government styling"""
@@ -77,6 +81,33 @@ def generate_text_pdf(text: str, doc_id: str = None, title: str = "Extracted Doc
     return pdf.output()
 
 
+def iter_pdf_chunks(pdf_bytes: bytes, chunk_size: int = PDF_STREAM_CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Yield a generated PDF in fixed-size chunks
+    
+    Slices a memoryview so the full document is never copied again
+    
+    Args:
+        pdf_bytes: PDF output from one of the generators
+        chunk_size: Bytes per chunk
+        
+    Returns:
+        Iterator over PDF chunks
+    """
+    view = memoryview(pdf_bytes)
+    for start in range(0, len(view), chunk_size):
+        yield bytes(view[start:start + chunk_size])
+
+
+def generate_text_pdf_stream(text: str, doc_id: str = None, title: str = "Extracted Document") -> Iterator[bytes]:
+    """
+    Generate a PDF from extracted text as a chunk iterator
+    
+    The document is rendered before returning, so errors surface to the caller
+    """
+    return iter_pdf_chunks(generate_text_pdf(text=text, doc_id=doc_id, title=title))
+
+
 def generate_summary_pdf(
     text: str,
     summaries: dict,
@@ -149,6 +180,20 @@ def generate_summary_pdf(
     return pdf.output()
 
 
+def generate_summary_pdf_stream(
+    text: str,
+    summaries: dict,
+    actions: list = None,
+    doc_id: str = None
+) -> Iterator[bytes]:
+    """
+    Generate a summary PDF as a chunk iterator
+    
+    The document is rendered before returning, so errors surface to the caller
+    """
+    return iter_pdf_chunks(generate_summary_pdf(text=text, summaries=summaries, actions=actions, doc_id=doc_id))
+
+
 def generate_rti_pdf(
     letter_content: str,
     applicant_name: str,
@@ -0,0 +1,56 @@
+"""
+Regex Engine Selection for eFile Sathi
+Compiles patterns with google-re2 (linear-time matching) when installed,
+falling back to Python's re module
+"""
+import re
+
+try:
+    import re2
+    RE2_AVAILABLE = True
+except ImportError:
+    RE2_AVAILABLE = False
+
+
+# RE2's \w, \d and \s are ASCII-only; these keep Devanagari text matching
+# the way it does under stdlib re
+_RE2_UNICODE_CLASSES = {
+    r'\w': r'\pL\pN_',
+    r'\d': r'\p{Nd}',
+    r'\s': r'\s\pZ',
+}
+_CLASS_OR_ESCAPE = re.compile(r'\[(?:\\.|[^\]\\])*\]|\\.')
+
+
+def to_re2_syntax(pattern: str) -> str:
+    """Rewrite shorthand classes in a stdlib pattern to RE2 Unicode classes"""
+    def replace(match):
+        token = match.group()
+        if token.startswith('['):
+            for shorthand, unicode_class in _RE2_UNICODE_CLASSES.items():
+                token = token.replace(shorthand, unicode_class)
+            return token
+        if token in _RE2_UNICODE_CLASSES:
+            return f"[{_RE2_UNICODE_CLASSES[token]}]"
+        return token
+    return _CLASS_OR_ESCAPE.sub(replace, pattern)
+
+
+def compile_pattern(pattern: str):
+    """
+    Compile a case-insensitive pattern
+
+    The RE2 pattern supports the search/match/finditer/group API used by
+    the modules, and cannot backtrack super-linearly on adversarial OCR
+    text. Patterns must avoid lookaround and backreferences, which RE2
+    does not support
+
+    Args:
+        pattern: Pattern in stdlib re syntax
+
+    Returns:
+        Compiled pattern object
+    """
+    if RE2_AVAILABLE:
+        return re2.compile('(?i)' + to_re2_syntax(pattern))
+    return re.compile(pattern, re.IGNORECASE)
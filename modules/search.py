@@ -4,6 +4,7 @@ Finds documents by MEANING, not just keywords
 Query: "recruitment freezes" → Finds: "hiring restrictions", "vacancy hold"
 """
 import json
+import threading
 import numpy as np
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple
@@ -50,6 +51,7 @@ class SemanticSearch:
         self.documents = {}
         self.embeddings = {}
         self.embeddings_path = DATA_DIR / "embeddings.json"
+        self._lock = threading.Lock()  # Guards index updates from worker threads
         
         # Government term synonyms for query expansion
         self.synonyms = {
@@ -90,23 +92,25 @@ class SemanticSearch:
         # Split into chunks for better search granularity
         chunks = self._chunk_text(text)
         
-        self.documents[doc_id] = {
-            'title': title or doc_id,
-            'text': text,
-            'chunks': chunks,
-            'metadata': metadata or {}
-        }
-        
         # Generate embeddings
-        if self.model:
-            chunk_embeddings = self.model.encode(chunks)
-            self.embeddings[doc_id] = {
+        chunk_embeddings = self.model.encode(chunks) if self.model else None
+        
+        with self._lock:
+            self.documents[doc_id] = {
+                'title': title or doc_id,
+                'text': text,
                 'chunks': chunks,
-                'vectors': chunk_embeddings.tolist()
+                'metadata': metadata or {}
             }
-        
-        # Save embeddings
-        self._save_embeddings()
+            
+            if chunk_embeddings is not None:
+                self.embeddings[doc_id] = {
+                    'chunks': chunks,
+                    'vectors': chunk_embeddings.tolist()
+                }
+            
+            # Save embeddings
+            self._save_embeddings()
     
     def search(self, query: str, top_k: int = 10) -> List[SearchResult]:
         """
@@ -44,7 +44,12 @@ class DocumentWorkflow:
 
 import json
 import sqlite3
-from modules.database import get_db_connection, init_db
+from modules.database import get_db_connection, init_db, transaction
+
+_INSERT_STEP_SQL = (
+    "INSERT INTO workflow_steps (doc_id, status, timestamp, officer, remarks) "
+    "VALUES (?, ?, ?, ?, ?)"
+)
 
 class WorkflowTracker:
     """
@@ -88,57 +93,52 @@ class WorkflowTracker:
         conn = get_db_connection()
         cursor = conn.cursor()
         
-        cursor.execute("SELECT count(*) FROM workflows")
-        count = cursor.fetchone()[0]
-        
-        if count == 0:
-            print("Initialization: Adding sample workflows...")
-            
-            # Sample 1
-            now = datetime.now()
-            doc1_id = 'DOC-2024-0001'
-            cursor.execute("""
-                INSERT INTO workflows (doc_id, title, current_status, created_at, updated_at, priority, expected_completion)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            """, (
-                doc1_id, 'Budget Revision Proposal Q4', WorkflowStatus.PENDING_APPROVAL.value,
-                (now - timedelta(days=5)).isoformat(), (now - timedelta(days=1)).isoformat(),
-                'high', (now + timedelta(days=3)).isoformat()
-            ))
-            
-            steps1 = [
-                (WorkflowStatus.SUBMITTED.value, (now - timedelta(days=5)).isoformat(), "Clerk (Entry)", "Document received"),
-                (WorkflowStatus.UNDER_REVIEW.value, (now - timedelta(days=3)).isoformat(), "Section Officer", "Under examination"),
-                (WorkflowStatus.PENDING_APPROVAL.value, (now - timedelta(days=1)).isoformat(), "Deputy Secretary", "Forwarded")
-            ]
-            
-            for status, ts, officer, rem in steps1:
-                cursor.execute("INSERT INTO workflow_steps (doc_id, status, timestamp, officer, remarks) VALUES (?, ?, ?, ?, ?)",
-                               (doc1_id, status, ts, officer, rem))
-            
-            # Sample 2
-            doc2_id = 'DOC-2024-0002'
-            cursor.execute("""
-                INSERT INTO workflows (doc_id, title, current_status, created_at, updated_at, priority)
-                VALUES (?, ?, ?, ?, ?, ?)
-            """, (
-                doc2_id, 'Transfer Order - Batch 2024', WorkflowStatus.ARCHIVED.value,
-                (now - timedelta(days=10)).isoformat(), (now - timedelta(days=2)).isoformat(), 'normal'
-            ))
-            
-            steps2 = [
-                (WorkflowStatus.SUBMITTED.value, (now - timedelta(days=10)).isoformat(), "Dealing Assistant", ""),
-                (WorkflowStatus.UNDER_REVIEW.value, (now - timedelta(days=8)).isoformat(), "Section Officer", ""),
-                (WorkflowStatus.PENDING_APPROVAL.value, (now - timedelta(days=5)).isoformat(), "Director", ""),
-                (WorkflowStatus.APPROVED.value, (now - timedelta(days=3)).isoformat(), "Joint Secretary", "Approved"),
-                (WorkflowStatus.ARCHIVED.value, (now - timedelta(days=2)).isoformat(), "Record Room", "")
-            ]
+        with transaction(conn):
+            cursor.execute("SELECT count(*) FROM workflows")
+            count = cursor.fetchone()[0]
             
-            for status, ts, officer, rem in steps2:
-                cursor.execute("INSERT INTO workflow_steps (doc_id, status, timestamp, officer, remarks) VALUES (?, ?, ?, ?, ?)",
-                               (doc2_id, status, ts, officer, rem))
-            
-            conn.commit()
+            if count == 0:
+                print("Initialization: Adding sample workflows...")
+                
+                # Sample 1
+                now = datetime.now()
+                doc1_id = 'DOC-2024-0001'
+                cursor.execute("""
+                    INSERT INTO workflows (doc_id, title, current_status, created_at, updated_at, priority, expected_completion)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                """, (
+                    doc1_id, 'Budget Revision Proposal Q4', WorkflowStatus.PENDING_APPROVAL.value,
+                    (now - timedelta(days=5)).isoformat(), (now - timedelta(days=1)).isoformat(),
+                    'high', (now + timedelta(days=3)).isoformat()
+                ))
+                
+                steps1 = [
+                    (WorkflowStatus.SUBMITTED.value, (now - timedelta(days=5)).isoformat(), "Clerk (Entry)", "Document received"),
+                    (WorkflowStatus.UNDER_REVIEW.value, (now - timedelta(days=3)).isoformat(), "Section Officer", "Under examination"),
+                    (WorkflowStatus.PENDING_APPROVAL.value, (now - timedelta(days=1)).isoformat(), "Deputy Secretary", "Forwarded")
+                ]
+                
+                cursor.executemany(_INSERT_STEP_SQL, [(doc1_id, *step) for step in steps1])
+                
+                # Sample 2
+                doc2_id = 'DOC-2024-0002'
+                cursor.execute("""
+                    INSERT INTO workflows (doc_id, title, current_status, created_at, updated_at, priority)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                """, (
+                    doc2_id, 'Transfer Order - Batch 2024', WorkflowStatus.ARCHIVED.value,
+                    (now - timedelta(days=10)).isoformat(), (now - timedelta(days=2)).isoformat(), 'normal'
+                ))
+                
+                steps2 = [
+                    (WorkflowStatus.SUBMITTED.value, (now - timedelta(days=10)).isoformat(), "Dealing Assistant", ""),
+                    (WorkflowStatus.UNDER_REVIEW.value, (now - timedelta(days=8)).isoformat(), "Section Officer", ""),
+                    (WorkflowStatus.PENDING_APPROVAL.value, (now - timedelta(days=5)).isoformat(), "Director", ""),
+                    (WorkflowStatus.APPROVED.value, (now - timedelta(days=3)).isoformat(), "Joint Secretary", "Approved"),
+                    (WorkflowStatus.ARCHIVED.value, (now - timedelta(days=2)).isoformat(), "Record Room", "")
+                ]
+                
+                cursor.executemany(_INSERT_STEP_SQL, [(doc2_id, *step) for step in steps2])
         conn.close()
 
     def create_workflow(
@@ -162,23 +162,19 @@ class WorkflowTracker:
         expected = now + timedelta(days=expected_days)
         
         conn = get_db_connection()
-        conn.execute("""
-            INSERT INTO workflows (doc_id, title, current_status, created_at, updated_at, priority, expected_completion)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        """, (
-            doc_id, title, WorkflowStatus.SUBMITTED.value,
-            now.isoformat(), now.isoformat(), priority, expected.isoformat()
-        ))
-        
-        # Initial step
-        conn.execute("""
-            INSERT INTO workflow_steps (doc_id, status, timestamp, officer, remarks)
-            VALUES (?, ?, ?, ?, ?)
-        """, (
-            doc_id, WorkflowStatus.SUBMITTED.value, now.isoformat(), "System", "Document submitted"
-        ))
-        
-        conn.commit()
+        with transaction(conn):
+            conn.execute("""
+                INSERT INTO workflows (doc_id, title, current_status, created_at, updated_at, priority, expected_completion)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, (
+                doc_id, title, WorkflowStatus.SUBMITTED.value,
+                now.isoformat(), now.isoformat(), priority, expected.isoformat()
+            ))
+            
+            # Initial step
+            conn.execute(_INSERT_STEP_SQL, (
+                doc_id, WorkflowStatus.SUBMITTED.value, now.isoformat(), "System", "Document submitted"
+            ))
         conn.close()
         
         return self.get_workflow(doc_id)
@@ -194,29 +190,26 @@ class WorkflowTracker:
         conn = get_db_connection()
         cursor = conn.cursor()
         
-        # Check if exists
-        cursor.execute("SELECT 1 FROM workflows WHERE doc_id = ?", (doc_id,))
-        if not cursor.fetchone():
-            conn.close()
-            return None
+        with transaction(conn):
+            # Check if exists
+            cursor.execute("SELECT 1 FROM workflows WHERE doc_id = ?", (doc_id,))
+            found = cursor.fetchone() is not None
             
-        now = datetime.now()
-        
-        # Add step
-        cursor.execute("""
-            INSERT INTO workflow_steps (doc_id, status, timestamp, officer, remarks)
-            VALUES (?, ?, ?, ?, ?)
-        """, (doc_id, new_status, now.isoformat(), officer, remarks))
-        
-        # Update workflow
-        cursor.execute("""
-            UPDATE workflows SET current_status = ?, updated_at = ?
-            WHERE doc_id = ?
-        """, (new_status, now.isoformat(), doc_id))
-        
-        conn.commit()
+            if found:
+                now = datetime.now()
+                
+                # Add step
+                cursor.execute(_INSERT_STEP_SQL, (doc_id, new_status, now.isoformat(), officer, remarks))
+                
+                # Update workflow
+                cursor.execute("""
+                    UPDATE workflows SET current_status = ?, updated_at = ?
+                    WHERE doc_id = ?
+                """, (new_status, now.isoformat(), doc_id))
         conn.close()
         
+        if not found:
+            return None
         return self.get_workflow(doc_id)
     
     def get_workflow(self, doc_id: str) -> Optional[DocumentWorkflow]:
@@ -0,0 +1,76 @@
+import re
+
+import pytest
+
+from modules.classifier import CATEGORY_PATTERNS, DocumentClassifier
+
+
+SAMPLES = [
+    # 'memorandum' is matched by both a CIRCULAR and a MEMO pattern
+    "OFFICE MEMORANDUM\nSubject: memorandum of understanding with the State Government. "
+    "This memo is issued as an office note for information.",
+    "परिपत्र\nकार्यालय आदेश जारी। बजट व्यय नीति",
+    "सभी संबंधित को सूचित किया जाता है कि आदेशित टिप्पणी बैठक में प्रस्तुत की जाए। "
+    "बैठक की कार्यवृत्त संलग्न है।",
+    "GOVERNMENT ORDER\nIt is hereby ordered that the budget allocation of Rs. 5 crore "
+    "for the financial year 2024-25 is sanctioned. Funds shall be released w.e.f. 01/04/2024.",
+    "NOTICE INVITING TENDER\nSealed bids are invited for the procurement of office furniture. "
+    "Quotation and RFP documents are published in the Gazette notification.",
+    "Minutes of the meeting held on 12 March. Attendees reviewed the agenda and passed a "
+    "resolution on the draft policy guidelines and SOP framework.",
+    # Letters that IGNORECASE equates with ASCII but lower() does not
+    "POLİCY for ſanctioned funds: the BUDGET ALLOCATİON letter",
+    # \x1c is whitespace to re but not to Hyperscan
+    "Financial\x1cyear estimates, dear\x1csir, kindly note",
+]
+
+
+def baseline_classify(text):
+    """Scoring as originally written: one findall and search per pattern"""
+    scores = {}
+    for category, patterns in CATEGORY_PATTERNS.items():
+        score = 0.0
+        for pattern in patterns:
+            compiled = re.compile(pattern, re.IGNORECASE)
+            found = compiled.findall(text)
+            if found:
+                position_weight = 1.0 - (compiled.search(text).start() / len(text)) * 0.5
+                score += len(found) * position_weight
+        if score:
+            scores[category] = score
+
+    total_score = sum(scores.values())
+    ranked = sorted(scores.items(), key=lambda x: x[1] / total_score, reverse=True)
+    return (
+        ranked[0][0],
+        round(min(ranked[0][1] / total_score * 2, 0.95), 2),
+        [(cat.value, round(score / total_score, 2)) for cat, score in ranked[1:4]
+         if score / total_score > 0.1],
+    )
+
+
+@pytest.mark.parametrize("text", SAMPLES)
+def test_classify_matches_baseline(text):
+    result = DocumentClassifier().classify(text)
+    assert (result.category, result.confidence, result.suggested_categories) == baseline_classify(text)
+
+
+@pytest.mark.parametrize("backend", ["hyperscan", "ahocorasick"])
+@pytest.mark.parametrize("text", SAMPLES)
+def test_backends_agree(backend, text):
+    pytest.importorskip(backend)
+    result = DocumentClassifier(backend=backend).classify(text)
+    assert result == DocumentClassifier(backend="re").classify(text)
+
+
+def test_overlapping_patterns_are_counted_separately():
+    result = DocumentClassifier().classify(SAMPLES[0])
+    assert result.category.value == "memo"
+    assert result.confidence == 0.95
+
+
+def test_cached_results_are_not_shared():
+    classifier = DocumentClassifier()
+    first = classifier.classify(SAMPLES[0])
+    first.keywords_found.append("tampered")
+    assert "tampered" not in classifier.classify(SAMPLES[0]).keywords_found